@@ -0,0 +1,385 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`Benchmark` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+Benchmark Module
+
+"""
+
+from CategoriesLoader import CategoriesLoader
+from MatrixLoader import MatrixLoader
+from FeatureLoader import FeatureLoader
+from DataLoader import DataLoader
+from HyperparameterTuning import HyperparameterTuning
+from CompiledModel import compileModel, loadModel
+from SyntheticDataset import generateDataset
+from Profiler import maxRssMB
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+from sklearn.neural_network import MLPClassifier
+import TrainingModel
+import numpy as np
+import subprocess
+import tracemalloc
+import platform
+import argparse
+import tempfile
+import sklearn
+import json
+import os
+import time
+
+def timeit(function, repeat=3):
+  """
+  :param function: the function to time, called without argument
+  :param repeat: number of calls
+  :type function: function
+  :type repeat: int
+
+  :return: (the best wall time of the calls in seconds, the return of the last call)
+  :rtype: tuple
+  """
+  best, res = float('inf'), None
+  for _ in range(repeat):
+    start = time.perf_counter()
+    res = function()
+    best = min(best, time.perf_counter() - start)
+  return best, res
+
+def featuresBenchmark(imgs, repeat=3):
+  """
+  Compare the per image path FeatureLoader.getFeaturesFrom with the batched path
+  FeatureLoader.getFeaturesFromBatch on the given images and check that both give the same features
+
+  :param imgs: a stack of matrix images
+  :param repeat: number of timed runs of each path
+  :type imgs: ndarray of shape (N, H, W)
+  :type repeat: int
+
+  :return: dictionnary with the best time of each path, the speedup and the max absolute difference
+  :rtype: dict
+  """
+  fl = FeatureLoader()
+
+  t_loop, f_loop = timeit(lambda: np.stack([fl.getFeaturesFrom(img).copy() for img in imgs]), repeat)
+  t_batch, f_batch = timeit(lambda: fl.getFeaturesFromBatch(imgs), repeat)
+
+  res = {'images' : len(imgs),
+         'per_image_s' : t_loop,
+         'batch_s' : t_batch,
+         'speedup' : t_loop / t_batch,
+         'max_abs_diff' : float(np.abs(f_loop - f_batch).max())}
+
+  assert(res['max_abs_diff'] < 1e-8)
+
+  print("FEATURES {images} images : per image {per_image_s:.3f}s, batch {batch_s:.3f}s -> x{speedup:.1f} (max abs diff {max_abs_diff:.2e})".format(**res),end='\n\n')
+
+  return res
+
+def compiledModelBenchmark(mlp, lda, features, batch_sizes=(1, 64, 1024), calls=200, repeat=3):
+  """
+  Export the given (mlp, lda) couple as a CompiledModel, load it back and compare its predictions
+  and its latency by call with lda.transform followed by mlp.predict
+
+  :param mlp: a fitted MLPClassifier
+  :param lda: the fitted LinearDiscriminantAnalysis of the mlp
+  :param features: features of the samples to predict
+  :param batch_sizes: number of rows of the batches whose latency is measured
+  :param calls: number of timed calls of each batch size
+  :param repeat: number of timed runs of the calls
+  :type mlp: MLPClassifier
+  :type lda: LinearDiscriminantAnalysis
+  :type features: ndarray of shape (N, n_features)
+  :type batch_sizes: tuple
+  :type calls: int
+  :type repeat: int
+
+  :return: dictionnary with the size of the exported file, the number of different predictions, the max
+           absolute difference of the probabilities and the latency of each path for each batch size
+  :rtype: dict
+
+  :UC: the CompiledModel gives the same predictions as the mlp
+  """
+  with tempfile.TemporaryDirectory() as folder:
+    path = os.path.join(folder, "model.npz")
+    compileModel(mlp, lda).save(path)
+    size = os.path.getsize(path)
+    model = loadModel(path)
+
+  expected = mlp.predict(lda.transform(features))
+  res = {'size_bytes' : size,
+         'mismatches' : int((model.predict(features) != expected).sum()),
+         'max_abs_diff_proba' : float(np.abs(model.predictProba(features) - mlp.predict_proba(lda.transform(features))).max()),
+         'latency_us' : {}}
+
+  assert(res['mismatches'] == 0)
+
+  print("COMPILED MODEL {size_bytes} bytes : {mismatches} different predictions on {n} samples (max abs diff of probabilities {max_abs_diff_proba:.2e})".format(n=len(features), **res),end='\n\n')
+
+  for batch_size in batch_sizes:
+    batch = features[:batch_size]
+    t_sklearn, _ = timeit(lambda: [mlp.predict(lda.transform(batch)) for _ in range(calls)], repeat)
+    t_compiled, _ = timeit(lambda: [model.predict(batch) for _ in range(calls)], repeat)
+
+    res['latency_us'][len(batch)] = {'sklearn' : t_sklearn / calls * 1e6, 'compiled' : t_compiled / calls * 1e6}
+
+    print("\tBATCH {} : sklearn {:.1f}us, compiled {:.1f}us by call -> x{:.1f}".format(len(batch), t_sklearn / calls * 1e6, t_compiled / calls * 1e6, t_sklearn / t_compiled),end='\n')
+  print()
+
+  return res
+
+def fitModel(features, labels):
+  """
+  :param features: features of the training samples
+  :param labels: categorie of each training sample
+  :type features: ndarray of shape (N, n_features)
+  :type labels: ndarray
+
+  :return: a (mlp, lda) couple fitted like TrainingModel.train
+  :rtype: tuple
+  """
+  lda = LinearDiscriminantAnalysis(n_components=1).fit(features, labels)
+  mlp = MLPClassifier(solver='adam', hidden_layer_sizes=(32, 32), random_state=1, max_iter=10000, early_stopping=True)
+  mlp.fit(lda.transform(features), labels)
+
+  return mlp, lda
+
+def loadDataset(path="data/train", categories="data/descriptions/categories.txt"):
+  """
+  :return: a stack of all the training images found by a MatrixLoader and the categorie of each image
+  :rtype: (ndarray of shape (N, H, W), ndarray)
+  """
+  cl = CategoriesLoader(categories)
+  cl.foundCategories()
+
+  ml = MatrixLoader(path, cl.getCategories())
+  ml.generateTrainAndValidMatrixImg()
+
+  l_img = [(img, cat) for cat in cl.getCategories() for section in ['train_img', 'valid_img'] for img in ml.getDataImg()[cat][section]]
+
+  return np.stack([img for img, cat in l_img]), np.array([cat for img, cat in l_img])
+
+def loadImages(path="data/train", categories="data/descriptions/categories.txt"):
+  """
+  :return: a stack of all the training images found by a MatrixLoader
+  :rtype: ndarray of shape (N, H, W)
+  """
+  return loadDataset(path, categories)[0]
+
+def measure(function, repeat=3, memory=True):
+  """
+  :param function: the function to measure, called without argument
+  :param repeat: number of timed calls
+  :param memory: if True the function is called once more with tracemalloc to get its peak memory
+  :type function: function
+  :type repeat: int
+  :type memory: bool
+
+  :return: (dictionnary with the time of each call, the best and median times, the peak traced memory
+           and the peak resident memory of the process, the return of the last call)
+  :rtype: tuple
+  """
+  l_s, res = [], None
+  for _ in range(repeat):
+    t, res = timeit(function, 1)
+    l_s.append(t)
+
+  peak = None
+  if memory: # not in the timed calls, tracemalloc slows the allocations down
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+
+  return {'runs_s' : l_s, 'best_s' : min(l_s), 'median_s' : float(np.median(l_s)), 'peak_traced_mb' : peak, 'maxrss_mb' : maxRssMB()}, res
+
+def percentiles(l_s):
+  """
+  :param l_s: list of latencies in seconds
+  :type l_s: list
+
+  :return: dictionnary of the p50, p95, p99 and max latencies in ms
+  :rtype: dict
+  """
+  return {name : float(np.percentile(l_s, q)) * 1000 for name, q in [('p50', 50), ('p95', 95), ('p99', 99), ('max', 100)]}
+
+def gitCommit():
+  """
+  :return: the short hash of the current commit with a -dirty suffix when the tree is modified, None out of a git repository
+  :rtype: str
+  """
+  try:
+    folder = os.path.dirname(os.path.abspath(__file__))
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=folder, capture_output=True, text=True, check=True).stdout.strip()
+    dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=folder, capture_output=True, text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+  return commit + ("-dirty" if dirty else "")
+
+def runSuite(path="data", repeat=3, calls=200, workers=0, tuning=False, memory=True):
+  """
+  Time each stage of the pipeline on the dataset of the given folder (layout of the data folder, see SyntheticDataset):
+  decoding by MatrixLoader, features by FeatureLoader, DataLoader.load, DataLoader.convergeFeatures,
+  TrainingModel.train, HyperparameterTuning.startIterate (if tuning) and the prediction of a CompiledModel.
+
+  The bulk stages are reported by throughput, the per call stages by latency percentiles, each
+  stage with its peak memory.
+
+  :param path: root folder of the dataset, with train/<category>/ and descriptions/categories.txt
+  :param repeat: number of timed runs of each bulk stage
+  :param calls: number of timed calls of each per call stage
+  :param workers: number of workers used to decode the images
+  :param tuning: if True the grid search is also timed, once
+  :param memory: if True each stage is run once more to get its peak traced memory
+  :type path: str
+  :type repeat: int
+  :type calls: int
+  :type workers: int
+  :type tuning: bool
+  :type memory: bool
+
+  :return: the results of the suite
+  :rtype: dict
+  """
+  cl = CategoriesLoader(os.path.join(path, "descriptions", "categories.txt"))
+  cl.foundCategories()
+  categories = cl.getCategories()
+  d_stages = {}
+
+  def decode():
+    ml = MatrixLoader(os.path.join(path, "train"), categories)
+    ml.setParallelDecoding(workers)
+    ml.generateTrainAndValidMatrixImg()
+    return ml
+
+  d_stages['decoding'], ml = measure(decode, repeat, memory)
+  n = sum(len(l_img) for l_img in ml.getDictionnaryImg().values())
+  imgs = np.stack([img for cat in categories for section in ['train_img', 'valid_img'] for img in ml.getDataImg()[cat][section]])
+
+  fl = FeatureLoader()
+  d_stages['features'], features = measure(lambda: fl.getFeaturesFromBatch(imgs), repeat, memory)
+
+  def load():
+    dl = DataLoader(ml.getDataImg(), ml.getDictionnaryEndIndex())
+    dl.load()
+    return dl
+
+  d_stages['dataloader_load'], dl = measure(load, repeat, memory)
+
+  def stream():
+    ml_stream = MatrixLoader(os.path.join(path, "train"), categories)
+    ml_stream.generateTrainAndValidFiles()
+    return DataLoader(ml_stream.getDataImg(), ml_stream.getDictionnaryEndIndex()).loadStreaming(ml_stream, (1, max(workers, 1), 1))
+
+  d_stages['pipeline'], stats = measure(stream, repeat, memory)
+  d_stages['pipeline']['queues'] = {name : {'mean' : stage['queue_mean'], 'max' : stage['queue_max']} for name, stage in stats['stages'].items()}
+
+  for name, stage in [('decoding', 'images'), ('features', 'images'), ('dataloader_load', 'images'), ('pipeline', 'images')]:
+    d_stages[name]['throughput_per_s'] = n / d_stages[name]['median_s']
+
+  rng = np.random.default_rng(0)
+  l_subsets = [list(rng.choice(categories, rng.integers(2, len(categories) + 1), replace=False)) for _ in range(calls)]
+
+  def converge():
+    l_s = []
+    for sub_cat in l_subsets:
+      dl.subset_cache.clear() # the cost of a subset not asked yet
+      l_s.append(timeit(lambda: (dl.convergeFeatures(sub_cat, 'train'), dl.convergeFeatures(sub_cat, 'valid')), 1)[0])
+    return l_s
+
+  d_stages['converge_features'], l_s = measure(converge, 1, memory)
+  d_stages['converge_features']['latency_ms'] = percentiles(l_s)
+
+  def train():
+    TrainingModel.clearProjectionCache()
+    mlp = MLPClassifier(solver='adam', hidden_layer_sizes=(32, 32), random_state=1, max_iter=10000, early_stopping=True)
+    return TrainingModel.train(mlp, dl, categories) + (mlp,)
+
+  d_stages['train'], (train_evaluation, valid_evaluation, lda, mlp) = measure(train, repeat, memory)
+  d_stages['train']['throughput_per_s'] = len(train_evaluation.getRows()) / d_stages['train']['median_s']
+  d_stages['train']['valid_accuracy'] = valid_evaluation.getAccuracy()
+
+  if tuning:
+    d_stages['tuning'], hpt = measure(lambda: HyperparameterTuning(dl, categories).startIterate(), 1, False)
+
+  model = compileModel(mlp, lda)
+  valid_features = dl.getDictionnaryFeatures()['valid']
+
+  def predict():
+    return [timeit(lambda: model.predict(valid_features[i % len(valid_features)]), 1)[0] for i in range(calls)]
+
+  d_stages['predict_one'], l_s = measure(predict, 1, memory)
+  d_stages['predict_one']['latency_ms'] = percentiles(l_s)
+
+  d_stages['predict_batch'], _ = measure(lambda: model.predict(valid_features), repeat, memory)
+  d_stages['predict_batch']['throughput_per_s'] = len(valid_features) / d_stages['predict_batch']['median_s']
+
+  return {'commit' : gitCommit(),
+          'date' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+          'dataset' : {'path' : path, 'images' : n, 'categories' : len(categories), 'shape' : list(imgs.shape[1:])},
+          'config' : {'repeat' : repeat, 'calls' : calls, 'workers' : workers},
+          'platform' : {'python' : platform.python_version(), 'numpy' : np.__version__, 'sklearn' : sklearn.__version__, 'cpus' : os.cpu_count()},
+          'stages' : d_stages}
+
+def printResults(results):
+  """
+  :param results: the results of runSuite
+  :type results: dict
+
+  :return: none
+  :side effect: print a line by stage of the given results
+  """
+  print("BENCHMARK {} images, {} categories, commit {}".format(results['dataset']['images'], results['dataset']['categories'], results['commit']),end='\n\n')
+
+  for name, stage in results['stages'].items():
+    line = "\t{:<18} median {:9.3f}s".format(name, stage['median_s'])
+    if 'throughput_per_s' in stage:
+      line += " | {:12.1f} /s".format(stage['throughput_per_s'])
+    if 'latency_ms' in stage:
+      line += " | p50 {p50:.3f}ms p95 {p95:.3f}ms p99 {p99:.3f}ms".format(**stage['latency_ms'])
+    if stage['peak_traced_mb'] is not None:
+      line += " | peak {:.1f}MB".format(stage['peak_traced_mb'])
+    print(line)
+  print()
+
+def parseArgs():
+  """
+  :return: the options given on the command line
+  :rtype: argparse.Namespace
+  """
+  parser = argparse.ArgumentParser(description="Benchmarks of the pipeline")
+  parser.add_argument("--generate", type=int, default=None, help="write this number of synthetic images in --data before the benchmarks")
+  parser.add_argument("--categories", type=int, default=7, help="number of categories of the synthetic images")
+  parser.add_argument("--generate-workers", type=int, default=0, help="number of processes which write the synthetic images")
+  parser.add_argument("--data", default="data", help="root folder of the dataset, with train/<category>/ and descriptions/categories.txt")
+  parser.add_argument("--suite", action="store_true", help="run the timed benchmark of each stage of the pipeline")
+  parser.add_argument("--repeat", type=int, default=3, help="number of timed runs of each bulk stage")
+  parser.add_argument("--calls", type=int, default=200, help="number of timed calls of each per call stage")
+  parser.add_argument("--workers", type=int, default=0, help="number of workers used to decode the images")
+  parser.add_argument("--tuning", action="store_true", help="also time the grid search, once")
+  parser.add_argument("--no-memory", action="store_true", help="do not run each stage once more with tracemalloc")
+  parser.add_argument("--results", default="benchmarks.jsonl", help="jsonl file where the results of the suite are appended")
+  return parser.parse_args()
+
+if __name__ == "__main__":
+  args = parseArgs()
+
+  if args.generate is not None:
+    generateDataset(args.data, args.generate, args.categories, workers=args.generate_workers)
+
+  if args.suite:
+    results = runSuite(args.data, args.repeat, args.calls, args.workers, args.tuning, not args.no_memory)
+    printResults(results)
+
+    with open(args.results, 'a') as f:
+      f.write(json.dumps(results) + "\n")
+    print("Benchmark : results appended in " + args.results,end='\n\n')
+  else:
+    imgs, labels = loadDataset(os.path.join(args.data, "train"), os.path.join(args.data, "descriptions", "categories.txt"))
+    featuresBenchmark(imgs)
+
+    features = FeatureLoader().getFeaturesFromBatch(imgs)
+    compiledModelBenchmark(*fitModel(features, labels), features)
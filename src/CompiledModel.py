@@ -0,0 +1,195 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`CompiledModel` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+CompiledModel Module
+
+This module only needs numpy, a model is exported once with scikit-learn objects:
+
+    compileModel(mlp, lda).save("model.npz")
+
+and loaded back without importing scikit-learn:
+
+    model = loadModel("model.npz")
+    model.predict(features)
+
+The doctest of CompiledModel, run by python3 -m doctest CompiledModel.py, checks that it predicts
+like the (mlp, lda) couple for each activation, with 2 classes (the output layer of the mlp is then
+a single logistic unit) and with more classes (softmax output layer).
+
+"""
+
+import numpy as np
+
+ACTIVATIONS = {'identity' : lambda x: x,
+               'relu' : lambda x: np.maximum(x, 0, out=x),
+               'tanh' : lambda x: np.tanh(x, out=x),
+               'logistic' : lambda x: np.divide(1, 1 + np.exp(-x, out=x), out=x)}
+
+def compileModel(mlp, lda):
+    """
+    :param mlp: a fitted MLPClassifier
+    :param lda: the fitted LinearDiscriminantAnalysis whose transform gives the inputs of the mlp
+    :type mlp: MLPClassifier
+    :type lda: LinearDiscriminantAnalysis
+
+    :return: the CompiledModel of the given (mlp, lda) couple
+    :rtype: CompiledModel
+
+    :UC: lda.solver in ['svd','eigen'] & mlp.activation in ACTIVATIONS
+    """
+    assert(lda.solver in ['svd', 'eigen'])
+    assert(mlp.activation in ACTIVATIONS)
+
+    n_components = lda.n_components if lda.n_components is not None else min(len(lda.classes_) - 1, lda.scalings_.shape[0])
+    xbar = lda.xbar_ if lda.solver == 'svd' else np.zeros(lda.scalings_.shape[0])
+
+    d_arrays = {'lda_xbar' : xbar,
+                'lda_scalings' : lda.scalings_[:, :n_components],
+                'activation' : np.array(mlp.activation),
+                'out_activation' : np.array(mlp.out_activation_),
+                'classes' : mlp.classes_}
+
+    for i, (coef, intercept) in enumerate(zip(mlp.coefs_, mlp.intercepts_)):
+        d_arrays['coef_{}'.format(i)] = coef
+        d_arrays['intercept_{}'.format(i)] = intercept
+
+    return CompiledModel(d_arrays)
+
+def loadModel(path):
+    """
+    :param path: path of a .npz file written by CompiledModel.save
+    :type path: str
+
+    :return: the CompiledModel of the given file
+    :rtype: CompiledModel
+    """
+    with np.load(path, allow_pickle=False) as npz:
+        return CompiledModel({key : npz[key] for key in npz.files})
+
+class CompiledModel:
+    """
+    Create a CompiledModel which predicts like a (mlp, lda) couple with numpy only: the features
+    are projected by the LDA, then given to the layers of the mlp. It only holds the LDA
+    projection, the weights and biases of the layers, the activations and the class labels.
+
+    >>> import warnings
+    >>> from sklearn.exceptions import ConvergenceWarning
+    >>> from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+    >>> from sklearn.neural_network import MLPClassifier
+    >>> warnings.filterwarnings("ignore", category=ConvergenceWarning)
+    >>> rng = np.random.default_rng(0)
+    >>> for activation in ['relu', 'tanh', 'logistic', 'identity']:
+    ...     for n_classes in [2, 4]:
+    ...         features = rng.normal(size=(300, 10))
+    ...         labels = np.array(['angry', 'happy', 'sad', 'surprise'])[rng.integers(0, n_classes, 300)]
+    ...         lda = LinearDiscriminantAnalysis().fit(features, labels)
+    ...         mlp = MLPClassifier((8, 6), activation=activation, max_iter=50, random_state=1).fit(lda.transform(features), labels)
+    ...         model = compileModel(mlp, lda)
+    ...         same = (model.predict(features) == mlp.predict(lda.transform(features))).all()
+    ...         close = np.allclose(model.predictProba(features), mlp.predict_proba(lda.transform(features)))
+    ...         print(activation, n_classes, same, close)
+    relu 2 True True
+    relu 4 True True
+    tanh 2 True True
+    tanh 4 True True
+    logistic 2 True True
+    logistic 4 True True
+    identity 2 True True
+    identity 4 True True
+    """
+    def __init__(self, d_arrays):
+        """
+        :param d_arrays: dictionnary of the arrays given by compileModel or read by loadModel
+        :type d_arrays: dict
+        :build: a CompiledModel of the given arrays
+        """
+        self.d_arrays = d_arrays
+        self.xbar = d_arrays['lda_xbar']
+        self.scalings = d_arrays['lda_scalings']
+        self.activation = ACTIVATIONS[str(d_arrays['activation'])]
+        self.out_activation = str(d_arrays['out_activation'])
+        self.classes = d_arrays['classes']
+
+        n_layers = sum(key.startswith('coef_') for key in d_arrays)
+        self.l_coefs = [d_arrays['coef_{}'.format(i)] for i in range(n_layers)]
+        self.l_intercepts = [d_arrays['intercept_{}'.format(i)] for i in range(n_layers)]
+
+    def getClasses(self):
+        """
+        :return: the class labels of the model
+        :rtype: ndarray
+        """
+        return self.classes
+
+    def save(self, path):
+        """
+        :param path: path of the .npz file
+        :type path: str
+
+        :return: None
+        :side effect: write the arrays of the model in the given file
+        """
+        np.savez(path, **self.d_arrays)
+
+    def transform(self, features):
+        """
+        :param features: batch of features
+        :type features: ndarray of shape (N, n_features)
+
+        :return: the LDA projection of the given features
+        :rtype: ndarray
+        """
+        return (features - self.xbar) @ self.scalings
+
+    def decision(self, features):
+        """
+        :param features: batch of features
+        :type features: ndarray of shape (N, n_features)
+
+        :return: the output of the last layer of the mlp before its activation
+        :rtype: ndarray
+        """
+        x = self.transform(np.asarray(features, dtype=np.float64).reshape(-1, self.scalings.shape[0]))
+
+        for coef, intercept in zip(self.l_coefs[:-1], self.l_intercepts[:-1]):
+            x = self.activation(x @ coef + intercept)
+
+        return x @ self.l_coefs[-1] + self.l_intercepts[-1]
+
+    def predict(self, features):
+        """
+        :param features: batch of features
+        :type features: ndarray of shape (N, n_features)
+
+        :return: the predicted class label of each row of features
+        :rtype: ndarray
+        """
+        z = self.decision(features)
+
+        # the output activations are monotonic, the labels are given by the output of the last layer
+        if self.out_activation == 'logistic':
+            return self.classes[(z[:, 0] > 0).astype(np.int64)] if len(self.classes) == 2 else self.classes[np.argmax(z, axis=1)]
+        return self.classes[np.argmax(z, axis=1)]
+
+    def predictProba(self, features):
+        """
+        :param features: batch of features
+        :type features: ndarray of shape (N, n_features)
+
+        :return: the probability of each class for each row of features
+        :rtype: ndarray of shape (N, n_classes)
+        """
+        z = self.decision(features)
+
+        if self.out_activation == 'logistic':
+            p = 1 / (1 + np.exp(-z))
+            return np.hstack([1 - p, p]) if len(self.classes) == 2 else p
+
+        z = z - z.max(axis=1, keepdims=True)
+        np.exp(z, out=z)
+        return z / z.sum(axis=1, keepdims=True)
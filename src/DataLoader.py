@@ -10,6 +10,12 @@ DataLoader Module
 
 """
 from FeatureLoader import FeatureLoader
+from FeatureCache import FeatureCache, imageKey
+from Profiler import profiler
+from Pipeline import Pipeline
+from collections import OrderedDict
+from contextlib import nullcontext
+import threading
 import numpy as np
 from tqdm import tqdm # progress bar
 
@@ -36,11 +42,24 @@ class DataLoader:
         """
         self.dataimg = dataimg
         self.d_endindex = d_endindex
-        self.d_cat_index = {"train" : [], "valid" : []}
-        self.d_img = {"train" : [], "valid" : []}
-        self.d_features = {"train" : [], "valid" : []}
+        self.categories = list(dataimg)
+        self.d_code = {cat : code for code, cat in enumerate(self.categories)}
+        self.d_cat_index = {"train" : None, "valid" : None}
+        self.d_img = {"train" : None, "valid" : None}
+        self.d_features = {"train" : None, "valid" : None}
+        self.d_labels = {"train" : None, "valid" : None}
+        self.d_offset = {"train" : 0, "valid" : 0}
+        self.d_rows = {"train" : {}, "valid" : {}}
+        self.subset_cache = OrderedDict()
+        self.subset_cache_size = 32
+        self.version = 0
         self.sec = "train"
         self.fl = FeatureLoader()
+        self.cache = None
+        self.source = None
+        self.d_files = {"train" : None, "valid" : None}
+        self.image_cache = OrderedDict()
+        self.image_cache_size = 64
 
     def initProgressBar(self):
         """
@@ -73,27 +92,108 @@ class DataLoader:
         """
         return self.dataimg
 
+    def getCategories(self):
+        """
+        :return: the list of categories of the data, the label code of a categorie is its index in this list
+        :rtype: list
+        """
+        return self.categories
+
+    def getVersion(self):
+        """
+        :return: the number of times self has been loaded, the caches built on the content of self use it to know when they are stale
+        :rtype: int
+        """
+        return self.version
+
     def getDictionnaryImg(self):
         """
-        :return: dictionnary which contains the matrix image data organize by section
+        :return: dictionnary which contains the uint8 array of shape (N, H, W) of the matrix images of each section,
+                 None for the sections of a low memory DataLoader
         :rtype: dict
         """
         return self.d_img
 
-    def addInDictionnaryImg(self,section,img):
+    def setLowMemory(self,source,cache_size=64):
         """
+        In low memory mode the decoded images are dropped once their features are extracted, the
+        features are stored as float32 and only the files of the images are kept. The images asked
+        by __getitem__ are decoded again from the source and kept in a LRU cache of cache_size images.
+        load() can then be called only once since it drops the images of dataimg.
+
+        :param source: the MatrixLoader which gives dataimg, used to read the images again, None to keep the images in memory
+        :param cache_size: max number of decoded images kept by __getitem__
+        :type source: MatrixLoader
+        :type cache_size: int
+
         :return: none
-        :sideeffect: append in the given section of the d_img dict the given image
+        :sideeffect: set the low memory mode used by the next load() or loadStreaming()
+
+        :UC: cache_size > 0
+        """
+        assert(cache_size > 0)
+
+        self.source = source
+        self.image_cache_size = cache_size
+        self.image_cache.clear()
+
+    def isLowMemory(self):
+        """
+        :return: True if self drops the decoded images once their features are extracted
+        :rtype: bool
+        """
+        return self.source is not None
+
+    def getFeatureDtype(self):
+        """
+        :return: the type of the stored features, float32 in low memory mode otherwise float64
+        :rtype: type
+        """
+        return np.float32 if self.isLowMemory() else np.float64
+
+    def getImage(self,section,i):
         """
-        self.getDictionnaryImg()[section].append(img)
+        :param section: the section
+        :param i: the row of the image in the arrays of the section
+        :type section: str
+        :type i: int
+
+        :return: the matrix image of the given row, decoded again from its file in low memory mode
+        :rtype: ndarray
+
+        :UC: section == 'train' or 'valid' & the section is loaded
+        """
+        if self.d_img[section] is not None:
+            return self.d_img[section][i]
+
+        key = (section, int(i))
+        if key in self.image_cache:
+            self.image_cache.move_to_end(key)
+            return self.image_cache[key]
+
+        img = self.source.decodePayload(self.source.readPayload(self.d_files[section][i]))
+        img.flags.writeable = False
+
+        self.image_cache[key] = img
+        if len(self.image_cache) > self.image_cache_size:
+            self.image_cache.popitem(last=False)
+
+        return img
 
     def getDictionnaryFeatures(self):
         """
-        :return: dictionanry which contains matrix features extracted from matrix data image by using FeatureLoader
+        :return: dictionanry which contains the array of shape (N, n_components) of the features extracted by using FeatureLoader for each section
         :rtype: dict
         """
         return self.d_features
 
+    def getDictionnaryLabels(self):
+        """
+        :return: dictionnary which contains the array of shape (N,) of the label code of the categorie of each image for each section
+        :rtype: dict
+        """
+        return self.d_labels
+
     def getFeatureLoader(self):
         """
         :return: the FeatureLoader object
@@ -101,26 +201,106 @@ class DataLoader:
         """
         return self.fl
 
-    def addInDictionnaryFeatures(self,section,feature):
+    def setFeatureCache(self,path,max_bytes=256 * 2**20):
         """
+        :param path: path of the folder of the FeatureCache to use, None to not use any cache
+        :param max_bytes: max size of the cached features
+        :type path: str
+        :type max_bytes: int
+
         :return: none
-        :sideeffect: append in the given section the given matrix feature of the d_features dict  
+        :sideeffect: the features will be read from, and written in, a FeatureCache for the configuration of self.fl
+        """
+        self.cache = None if path is None else FeatureCache(path, self.getFeatureLoader().getConfig(), max_bytes)
+
+    def getFeatureCache(self):
+        """
+        :return: the FeatureCache used by self, None if the features are not cached
+        :rtype: FeatureCache
         """
-        self.getDictionnaryFeatures()[section].append(feature)
+        return self.cache
+
+    def extractFeatures(self,l_img,lock=None):
+        """
+        :param l_img: list of matrix images
+        :param lock: lock held around the accesses to the FeatureCache when it is shared by threads,
+                     the features of the missing images are extracted without it
+        :type l_img: list
+        :type lock: threading.Lock
+
+        :return: the features of the given images, read from the FeatureCache when they are in
+                 otherwise extracted in one batched call by self.fl
+        :rtype: ndarray
+        """
+        if len(l_img) == 0:
+            return np.zeros((0, self.getFeatureLoader().getConfig()['n_components']))
+
+        if self.cache is None:
+            profiler.count("features_extracted", len(l_img))
+            return self.getFeatureLoader().getFeaturesFromBatch(np.asarray(l_img))
+
+        keys = [imageKey(img) for img in l_img]
+        with lock or nullcontext():
+            features, miss = self.cache.get(keys)
+
+        if miss.any():
+            l_miss = np.flatnonzero(miss)
+            features[l_miss] = self.getFeatureLoader().getFeaturesFromBatch(np.asarray(l_img)[l_miss])
+            with lock or nullcontext():
+                profiler.count("features_extracted", len(l_miss))
+                self.cache.put([keys[i] for i in l_miss], features[l_miss])
+
+        return features
 
     def getDictCategoriesIndex(self):
         """
-        :return: dictionnary which contains couple (categorie, index) of image for each section train and valid
+        :return: dictionnary which contains the array of shape (N, 2) of the couples (categorie code, index in the categorie) of image for each section train and valid
         :rtype: dict
         """
         return self.d_cat_index
 
-    def addInDictCategorieIndex(self,section,cat,index):
+    def allocateSection(self,section):
+        """
+        :param section: the section
+        :type section: str
+
+        :return: none
+        :sideeffect: preallocate the arrays of images, features, labels and categorie index of the given section for all the images of dataimg
+
+        :UC: section == 'train' or 'valid'
+        """
+        l_sizes = [len(self.getDataImg()[cat][section+"_img"]) for cat in self.categories]
+        n = sum(l_sizes)
+
+        first = next((self.getDataImg()[cat][section+"_img"][0] for cat, size in zip(self.categories, l_sizes) if size > 0), np.zeros((0, 0), dtype=np.uint8))
+
+        self.allocateArrays(section, n, first)
+
+    def allocateArrays(self,section,n,first):
         """
+        :param section: the section
+        :param n: number of images of the section
+        :param first: an image of the section, which gives the shape and type of all of them
+        :type section: str
+        :type n: int
+        :type first: ndarray
+
         :return: none
-        :sideeffect: append in the given section of the d_cat_index dict the given tuple by (cat,index)
+        :sideeffect: preallocate the arrays of images, features, labels and categorie index of the given section for n images,
+                     in low memory mode the images are not allocated but the list of their files is kept
+
+        :UC: section == 'train' or 'valid'
         """
-        self.getDictCategoriesIndex()[section].append((cat,index))
+        if self.isLowMemory():
+            self.d_img[section] = None
+            self.d_files[section] = [file for cat in self.categories for file in self.getDataImg()[cat][section+"_file"]]
+            self.image_cache.clear()
+        else:
+            self.d_img[section] = np.empty((n,) + first.shape, dtype=first.dtype)
+        self.d_features[section] = np.empty((n, self.getFeatureLoader().getConfig()['n_components']), dtype=self.getFeatureDtype())
+        self.d_labels[section] = np.empty(n, dtype=np.int64)
+        self.d_cat_index[section] = np.empty((n, 2), dtype=np.int64)
+        self.d_offset[section] = 0
     
     def getSection(self):
         """
@@ -147,24 +327,32 @@ class DataLoader:
         :type section: str
 
         :return: none
-        :sideeffect: fill d_img dict, d_cat_index and d_features by iterating on dataimg by append directly in and extract features with self.features (FeatureLoader object with PCA)
+        :sideeffect: fill the rows of the given categorie in the preallocated arrays of d_img, d_cat_index, d_labels and d_features with the images of dataimg and their features given by extractFeatures(),
+                     in low memory mode the images of the categorie are then dropped from dataimg
 
-        :UC: section == 'train' or 'valid'
+        :UC: section == 'train' or 'valid' & allocateSection(section) has been called
         """
         self.initProgressBar()
         self.setTotalProgressBar(self.d_endindex[cat][section])
 
-        i = 0
-        for img in self.getDataImg()[cat][section+"_img"]:
-            self.addInDictionnaryImg(section,img)
-            self.addInDictCategorieIndex(section,cat,i)
-
-            f = self.getFeatureLoader().getFeaturesFrom(img)
+        l_img = self.getDataImg()[cat][section+"_img"]
+        start = self.d_offset[section]
+        end = start + len(l_img)
 
-            self.addInDictionnaryFeatures(section,f)
-            self.incrementProgressBar()
+        if self.d_img[section] is None:
+            self.d_features[section][start:end] = self.extractFeatures(l_img)
+            self.getDataImg()[cat][section+"_img"] = None # the decoded images are dropped once their features are extracted
+        else:
+            if len(l_img) > 0:
+                self.d_img[section][start:end] = np.asarray(l_img)
+            self.d_features[section][start:end] = self.extractFeatures(self.d_img[section][start:end])
+        self.d_labels[section][start:end] = self.d_code[cat]
+        self.d_cat_index[section][start:end, 0] = self.d_code[cat]
+        self.d_cat_index[section][start:end, 1] = np.arange(len(l_img))
+        self.d_offset[section] = end
 
-            i += 1
+        self.progressBar.update(len(l_img))
+        self.progressBar.close()
 
     def convergeFeatures(self,categories,section):
         """
@@ -173,27 +361,119 @@ class DataLoader:
         :type categories: list
         :type section: str
 
-        :return: a first list which contains all features matrix and a second one with the categorie name of original image of each index of the first list
-        :rtype: (list, list)
+        :return: a first array which contains all features matrix of the given categories and a second one with the categorie name of original image of each row of the first array
+        :rtype: (ndarray, ndarray)
         """
         self.setSection(section)
 
-        l_features = []
-        l_cat = []
+        return self.getSubset(categories, self.getSection())
 
-        for i in range(len(self.getDictCategoriesIndex()[self.getSection()])):
-            (img, f, cat) = self[i]
-            
-            if cat not in categories:
-                continue
+    def buildCategoriesRows(self,section):
+        """
+        :param section: the section
+        :type section: str
+
+        :return: none
+        :sideeffect: fill d_rows[section] with the array of the rows of each categorie code in the arrays of the given section
+
+        :UC: section == 'train' or 'valid' & the section is loaded
+        """
+        labels = self.d_labels[section]
+        self.d_rows[section] = {code : np.flatnonzero(labels == code) for code in range(len(self.categories))}
 
-            l_cat.append(cat)
-            l_features.append(f)
+    def getSubsetRows(self,categories,section):
+        """
+        :param categories: list of categories
+        :param section: the section
+        :type categories: list
+        :type section: str
+
+        :return: the sorted rows of the given categories in the arrays of the given section, they are the rows of the arrays given by getSubset()
+        :rtype: ndarray
+
+        :UC: section == 'train' or 'valid' & the section is loaded
+        """
+        codes = set(self.d_code[cat] for cat in categories if cat in self.d_code)
+
+        return np.sort(np.concatenate([self.d_rows[section][code] for code in codes] + [np.zeros(0, dtype=np.int64)]))
+
+    def getSubset(self,categories,section):
+        """
+        Select the features and the categorie names of the given categories with the rows
+        index built at loading. The last subset_cache_size selected subsets are kept so
+        a subset already asked is returned without any copy.
+
+        :param categories: list of categories
+        :param section: the section
+        :type categories: list
+        :type section: str
+
+        :return: a first read-only array which contains all features matrix of the given categories and a second one with the categorie name of original image of each row of the first array
+        :rtype: (ndarray, ndarray)
+
+        :UC: section == 'train' or 'valid' & the section is loaded
+        """
+        codes = frozenset(self.d_code[cat] for cat in categories if cat in self.d_code)
+        key = (section, codes)
+
+        if key in self.subset_cache:
+            self.subset_cache.move_to_end(key)
+            return self.subset_cache[key]
+
+        rows = self.getSubsetRows(categories, section)
 
-        l_features = np.stack(l_features, axis=0)
+        l_features = self.d_features[section][rows]
+        l_cat = np.array(self.categories)[self.d_labels[section][rows]]
+        l_features.flags.writeable = False
+        l_cat.flags.writeable = False
+
+        self.subset_cache[key] = (l_features, l_cat)
+        if len(self.subset_cache) > self.subset_cache_size:
+            self.subset_cache.popitem(last=False)
 
         return l_features, l_cat
 
+    def iterBatches(self,categories,section,batch_size=256,shuffle=True,seed=None,rows=False):
+        """
+        Generator of the mini-batches of the given categories in the given section, only one
+        mini-batch of features is copied at a time.
+
+        :param categories: list of categories
+        :param section: the section
+        :param batch_size: number of rows of each mini-batch
+        :param shuffle: if True the rows are given in a random order
+        :param seed: seed of the random order
+        :param rows: if True the rows of the mini-batch in the arrays of the section are also given
+        :type categories: list
+        :type section: str
+        :type batch_size: int
+        :type shuffle: bool
+        :type seed: int
+        :type rows: bool
+
+        :return: generator of tuples (features of the mini-batch, categorie names of the mini-batch) or (features, categorie names, rows)
+        :rtype: generator
+
+        :UC: section == 'train' or 'valid' & the section is loaded & batch_size > 0
+        """
+        assert(batch_size > 0)
+
+        codes = sorted(set(self.d_code[cat] for cat in categories if cat in self.d_code))
+        l_rows = np.concatenate([self.d_rows[section][code] for code in codes] + [np.zeros(0, dtype=np.int64)])
+
+        if shuffle:
+            l_rows = np.random.default_rng(seed).permutation(l_rows)
+
+        names = np.array(self.categories)
+
+        for start in range(0, len(l_rows), batch_size):
+            batch = l_rows[start:start + batch_size]
+            if rows:
+                yield self.d_features[section][batch], names[self.d_labels[section][batch]], batch
+            else:
+                yield self.d_features[section][batch], names[self.d_labels[section][batch]]
+
+    @profiler.stage("features")
     def load(self):
         """
         For each categories this method will call loadSectionFeaturesFromCategory() method of self
@@ -203,7 +483,15 @@ class DataLoader:
         """
         print("\n\nDataLoader.load STARTED...",end='\n\n')
 
-        for cat in self.getDataImg():
+        if self.cache is not None:
+            self.cache.load()
+
+        self.version += 1
+        self.subset_cache.clear()
+        self.allocateSection("train")
+        self.allocateSection("valid")
+
+        for cat in self.categories:
 
             print("\n\n\tEnter in category : " + cat,end='\n\n')
             print("LOAD FEATURES STARTING...")
@@ -212,15 +500,148 @@ class DataLoader:
             self.loadSectionFeaturesFromCategory(cat,"valid")
 
             print("DONE !")
+
+        self.buildCategoriesRows("train")
+        self.buildCategoriesRows("valid")
+
+        if self.cache is not None:
+            self.cache.save()
+            print("\n\nFEATURE CACHE -> hits {} misses {}".format(self.cache.getHits(), self.cache.getMisses()),end='\n\n')
+
         print("\n\nDataLoader.load DONE!",end='\n\n')
 
+    def getStreamingJobs(self,batch_size):
+        """
+        :param batch_size: number of images of a job
+        :type batch_size: int
+
+        :return: the list of the jobs of loadStreaming, tuples (section, categorie code, first row in the arrays of the section,
+                 index of the first image in the categorie, list of the files of the job)
+        :rtype: list
+
+        :UC: batch_size > 0
+        """
+        l_jobs = []
+        for section in ["train", "valid"]:
+            row = 0
+            for cat in self.categories:
+                l_files = self.getDataImg()[cat][section+"_file"]
+                for start in range(0, len(l_files), batch_size):
+                    l_jobs.append((section, self.d_code[cat], row + start, start, l_files[start:start + batch_size]))
+                row += len(l_files)
+
+        return l_jobs
+
+    @profiler.stage("pipeline")
+    def loadStreaming(self,ml,workers=(1, 1, 1),batch_size=64,capacity=8):
+        """
+        Fill self like load() with a streaming pipeline reader -> decoder -> features -> sink: the
+        images are read, decoded and their features extracted by batch of batch_size images while
+        the next ones are still read. At most capacity batches wait between two stages, so only a
+        few batches of encoded or decoded images are in flight whatever the size of the dataset.
+        The train_img and valid_img of dataimg are set to views on the arrays of self, or to None
+        in low memory mode where the images are dropped by the sink (see setLowMemory).
+
+        :param ml: the MatrixLoader which gives dataimg, its images are listed but not decoded
+        :param workers: number of threads of the reader, decoder and features stages
+        :param batch_size: number of images of an item of the pipeline
+        :param capacity: max number of items waiting in the queue of each stage
+        :type ml: MatrixLoader
+        :type workers: tuple
+        :type batch_size: int
+        :type capacity: int
+
+        :return: the stats of the pipeline (see Pipeline.run)
+        :rtype: dict
+
+        :UC: ml.generateTrainAndValidFiles() has been called & len(workers) == 3 & batch_size > 0
+        """
+        assert(len(workers) == 3 and batch_size > 0)
+
+        print("\n\nDataLoader.loadStreaming STARTED...",end='\n\n')
+
+        if self.cache is not None:
+            self.cache.load()
+
+        self.version += 1
+        self.subset_cache.clear()
+
+        l_jobs = self.getStreamingJobs(batch_size)
+        # the first image gives the shape and type of the preallocated arrays
+        first = ml.decodePayload(ml.readPayload(l_jobs[0][4][0])) if len(l_jobs) > 0 else np.zeros((0, 0), dtype=np.uint8)
+        for section in ["train", "valid"]:
+            self.allocateArrays(section, sum(len(self.getDataImg()[cat][section+"_file"]) for cat in self.categories), first)
+
+        cache_lock = threading.Lock() # the FeatureCache is shared by the threads of the features stage, the SVD runs outside the lock
+
+        def read(job):
+            return job, [ml.readPayload(file) for file in job[4]]
+
+        def decode(item):
+            job, l_payloads = item
+            return job, np.stack([ml.decodePayload(payload) for payload in l_payloads])
+
+        def extract(item):
+            job, imgs = item
+            return job, imgs, self.extractFeatures(imgs, cache_lock)
+
+        def sink(item):
+            (section, code, row, index, l_files), imgs, features = item
+            end = row + len(l_files)
+            if self.d_img[section] is not None:
+                self.d_img[section][row:end] = imgs
+            self.d_features[section][row:end] = features
+            self.d_labels[section][row:end] = code
+            self.d_cat_index[section][row:end, 0] = code
+            self.d_cat_index[section][row:end, 1] = np.arange(index, index + len(l_files))
+            profiler.count("images_decoded", len(l_files))
+            self.progressBar.update(len(l_files))
+
+        pipeline = Pipeline(capacity)
+        pipeline.addStage("reader", read, workers[0])
+        pipeline.addStage("decoder", decode, workers[1])
+        pipeline.addStage("features", extract, workers[2])
+
+        self.initProgressBar()
+        self.setTotalProgressBar(sum(len(job[4]) for job in l_jobs))
+        try:
+            stats = pipeline.run(l_jobs, sink)
+        finally:
+            self.progressBar.close()
+
+        for section in ["train", "valid"]:
+            start = 0
+            for cat in self.categories:
+                end = start + len(self.getDataImg()[cat][section+"_file"])
+                self.getDataImg()[cat][section+"_img"] = None if self.d_img[section] is None else self.d_img[section][start:end] # views, no copy
+                start = end
+            self.d_offset[section] = start
+
+        self.buildCategoriesRows("train")
+        self.buildCategoriesRows("valid")
+
+        if self.cache is not None:
+            self.cache.save()
+            print("\n\nFEATURE CACHE -> hits {} misses {}".format(self.cache.getHits(), self.cache.getMisses()),end='\n\n')
+
+        n = sum(len(job[4]) for job in l_jobs)
+        stats['images'] = n
+        print("\n\nPIPELINE {} IMAGES IN {:.2f}s -> {:.1f} img/s".format(n, stats['elapsed_s'], n / max(stats['elapsed_s'], 1e-9)),end='\n\n')
+        for name, stage in stats['stages'].items():
+            print("\t- {} : workers {} busy {:.2f}s queue mean {:.1f} max {}/{} blocked put {:.2f}s".format(name, stage['workers'], stage['busy_s'], stage['queue_mean'], stage['queue_max'], stage['queue_capacity'], stage['blocked_put_s']))
+
+        print("\n\nDataLoader.loadStreaming DONE!",end='\n\n')
+
+        return stats
+
     def __getitem__(self,i):
         """
-        :param i: the index of the wanted element in the d_list[self.sec] list
+        :param i: the index of the wanted element in the arrays of the self.sec section
         :type i: int
         
-        :return: a tuple that contains the following information about the image at the given i index (matrix, features, categorie)
+        :return: a tuple that contains the following information about the image at the given i index (matrix, features, categorie),
+                 the matrix is decoded again in low memory mode (see getImage)
         :rtype: tuple
         """
-        cat, index = self.getDictCategoriesIndex()[self.getSection()][i]
-        return self.getDictionnaryImg()[self.getSection()][i], self.getDictionnaryFeatures()[self.getSection()][i], cat
\ No newline at end of file
+        code = self.d_labels[self.getSection()][i]
+        return self.getImage(self.getSection(), i), self.getDictionnaryFeatures()[self.getSection()][i], self.categories[code]
\ No newline at end of file
@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`Evaluation` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+Evaluation Module
+
+"""
+
+from Profiler import profiler
+import numpy as np
+
+def evaluate(mlp, features, expected, rows=None):
+    """
+    :param mlp: a fitted classifier
+    :param features: the features given to the classifier
+    :param expected: the categorie of each row of features
+    :param rows: the row of each sample in its DataLoader section, None if they are the rows of features
+    :type mlp: MLPClassifier
+    :type features: ndarray
+    :type expected: ndarray
+    :type rows: ndarray
+
+    :return: the Evaluation of one batched prediction of the classifier on the given features
+    :rtype: Evaluation
+    """
+    supposed = mlp.predict(features)
+    profiler.count("samples_predicted", len(supposed))
+
+    return Evaluation(np.union1d(mlp.classes_, expected), expected, supposed, rows)
+
+class Evaluation:
+    """
+    Create an Evaluation of the predictions of a classifier on a section: the confusion
+    matrix, the accuracy, the precision and recall of each categorie and the rows of the
+    correct and incorrect samples.
+
+    The categories of the confusion matrix are sorted like the classes of a MLPClassifier.
+    """
+    def __init__(self, categories, expected, supposed, rows=None):
+        """
+        :param categories: the categories which can be expected or supposed
+        :param expected: the categorie of each sample
+        :param supposed: the predicted categorie of each sample
+        :param rows: the row of each sample in its DataLoader section, None for range(len(expected))
+        :type categories: list
+        :type expected: ndarray
+        :type supposed: ndarray
+        :type rows: ndarray
+        :build: the Evaluation of the given predictions
+
+        :UC: len(expected) == len(supposed) & every expected and supposed categorie is in categories
+        """
+        assert(len(expected) == len(supposed))
+
+        self.categories = np.unique(np.asarray(categories))
+        self.expected = np.asarray(expected)
+        self.supposed = np.asarray(supposed)
+        self.rows = np.arange(len(self.expected)) if rows is None else np.asarray(rows)
+
+        n = len(self.categories)
+        expected_code = np.searchsorted(self.categories, self.expected)
+        supposed_code = np.searchsorted(self.categories, self.supposed)
+
+        self.confusion = np.bincount(expected_code * n + supposed_code, minlength=n * n).reshape(n, n)
+        self.correct = (self.expected == self.supposed)
+
+    def getCategories(self):
+        """
+        :return: the sorted categories of the lines and columns of the confusion matrix
+        :rtype: ndarray
+        """
+        return self.categories
+
+    def getExpected(self):
+        """
+        :return: the categorie of each sample
+        :rtype: ndarray
+        """
+        return self.expected
+
+    def getSupposed(self):
+        """
+        :return: the predicted categorie of each sample
+        :rtype: ndarray
+        """
+        return self.supposed
+
+    def getRows(self):
+        """
+        :return: the row of each sample in its DataLoader section
+        :rtype: ndarray
+        """
+        return self.rows
+
+    def getConfusionMatrix(self):
+        """
+        :return: the confusion matrix, the line i counts the samples of the categorie i by predicted categorie
+        :rtype: ndarray
+        """
+        return self.confusion
+
+    def getAccuracy(self):
+        """
+        :return: the portion of correctly predicted samples
+        :rtype: float
+        """
+        return float(self.correct.mean()) if len(self.correct) > 0 else 0.0
+
+    def getPrecision(self):
+        """
+        :return: the precision of each categorie, 0 for a categorie never predicted
+        :rtype: ndarray
+        """
+        supposed = self.confusion.sum(axis=0)
+        return np.divide(np.diag(self.confusion), supposed, out=np.zeros(len(self.categories)), where=supposed > 0)
+
+    def getRecall(self):
+        """
+        :return: the recall of each categorie, 0 for a categorie without any sample
+        :rtype: ndarray
+        """
+        expected = self.confusion.sum(axis=1)
+        return np.divide(np.diag(self.confusion), expected, out=np.zeros(len(self.categories)), where=expected > 0)
+
+    def getCorrectRows(self):
+        """
+        :return: the rows of the correctly predicted samples
+        :rtype: ndarray
+        """
+        return self.rows[self.correct]
+
+    def getIncorrectRows(self):
+        """
+        :return: the rows of the wrongly predicted samples
+        :rtype: ndarray
+        """
+        return self.rows[~self.correct]
+
+    def getReport(self):
+        """
+        :return: dictionnary which contains the accuracy, and the precision, recall and number of samples of each categorie
+        :rtype: dict
+        """
+        return {'accuracy' : self.getAccuracy(),
+                'categories' : {str(cat) : {'precision' : float(p), 'recall' : float(r), 'support' : int(s)}
+                                for cat, p, r, s in zip(self.categories, self.getPrecision(), self.getRecall(), self.confusion.sum(axis=1))}}
@@ -0,0 +1,208 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`FeatureCache` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+FeatureCache Module
+
+"""
+
+import numpy as np
+import hashlib
+import json
+import os
+
+def imageKey(img):
+    """
+    :param img: a matrix image
+    :type img: ndarray
+
+    :return: the sha1 hexdigest of the shape, type and bytes of the given matrix image
+    :rtype: str
+    """
+    img = np.ascontiguousarray(img)
+    h = hashlib.sha1("{}{}".format(img.shape, img.dtype.str).encode())
+    h.update(img.data)
+    return h.hexdigest()
+
+class FeatureCache:
+    """
+    Create a FeatureCache which keeps on disk the features of the images already seen,
+    keyed by the content of the image and the configuration of the FeatureLoader.
+
+    The features of a configuration are stored in one .npy array with a json index
+    of the image keys. When the cache is bigger than max_bytes the least recently
+    used features are evicted at save.
+    """
+    def __init__(self, path, config, max_bytes=256 * 2**20):
+        """
+        :param path: path of the folder of the cache
+        :param config: configuration of the FeatureLoader which computes the features
+        :param max_bytes: max size of the features array of the configuration
+        :type path: str
+        :type config: dict
+        :type max_bytes: int
+        :build: a FeatureCache for the given configuration, the cache on disk is read by load()
+
+        :UC: type(path) == str & max_bytes > 0
+        """
+        assert(type(path) == str)
+        assert(max_bytes > 0)
+
+        name = hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+        self.path = os.path.join(path, name)
+        self.config = config
+        self.max_bytes = max_bytes
+        self.l_keys = []
+        self.d_row = {}
+        self.features = None
+        self.last_used = np.zeros(0, dtype=np.int64)
+        self.clock = 0
+        self.l_new_keys = []
+        self.l_new_features = []
+        self.hits = 0
+        self.misses = 0
+
+    def getFeaturesPath(self):
+        """
+        :return: the path of the .npy file which contains the cached features
+        :rtype: str
+        """
+        return os.path.join(self.path, "features.npy")
+
+    def getIndexPath(self):
+        """
+        :return: the path of the json index of the cached features
+        :rtype: str
+        """
+        return os.path.join(self.path, "index.json")
+
+    def getHits(self):
+        """
+        :return: the number of image features found in the cache
+        :rtype: int
+        """
+        return self.hits
+
+    def getMisses(self):
+        """
+        :return: the number of image features not found in the cache
+        :rtype: int
+        """
+        return self.misses
+
+    def load(self):
+        """
+        :return: None
+        :side effect: read the features and the index of the cache folder if they exist
+        """
+        try:
+            with open(self.getIndexPath(), 'r') as f:
+                index = json.load(f)
+            features = np.load(self.getFeaturesPath())
+        except (OSError, ValueError):
+            return
+
+        if index['config'] != self.config or features.shape[0] != len(index['keys']):
+            return
+
+        self.l_keys = index['keys']
+        self.d_row = {key : i for i, key in enumerate(self.l_keys)}
+        self.features = features
+        self.last_used = np.array(index['last_used'], dtype=np.int64)
+        self.clock = index['clock']
+
+    def get(self, keys):
+        """
+        :param keys: list of image keys
+        :type keys: list
+
+        :return: (array of the cached features of the given keys, boolean array which is True for the keys not in the cache)
+                 the rows of the missing keys are left uninitialized
+        :rtype: (ndarray, ndarray)
+        """
+        self.clock += 1
+
+        rows = np.array([self.d_row.get(key, -1) for key in keys], dtype=np.int64)
+        miss = rows < 0
+
+        n_features = self.config['n_components']
+        features = np.empty((len(keys), n_features), dtype=np.float64)
+
+        if self.features is not None and (~miss).any():
+            features[~miss] = self.features[rows[~miss]]
+            self.last_used[rows[~miss]] = self.clock
+
+        self.misses += int(miss.sum())
+        self.hits += len(keys) - int(miss.sum())
+
+        return features, miss
+
+    def put(self, keys, features):
+        """
+        :param keys: list of image keys
+        :param features: features of the given keys
+        :type keys: list
+        :type features: ndarray
+
+        :return: None
+        :side effect: add the given features of the keys not already in the cache, they are written on disk by save()
+        """
+        s_new = set(self.l_new_keys)
+        l_rows = []
+
+        for i, key in enumerate(keys):
+            if key not in self.d_row and key not in s_new:
+                s_new.add(key)
+                self.l_new_keys.append(key)
+                l_rows.append(i)
+
+        self.l_new_features.append(np.asarray(features, dtype=np.float64)[l_rows])
+
+    def save(self):
+        """
+        :return: None
+        :side effect: write the features and the index of the cache, the least recently used features
+                      are evicted when the features array is bigger than max_bytes
+        """
+        if len(self.l_new_keys) == 0 and self.features is None:
+            return
+
+        l_keys = self.l_keys
+        n_features = self.config['n_components']
+        features = self.features if self.features is not None else np.zeros((0, n_features))
+        last_used = self.last_used
+
+        if len(self.l_new_keys) > 0:
+            l_keys = l_keys + self.l_new_keys
+            features = np.concatenate([features] + self.l_new_features)
+            last_used = np.concatenate([last_used, np.full(len(self.l_new_keys), self.clock, dtype=np.int64)])
+
+        max_rows = max(1, self.max_bytes // (n_features * features.itemsize))
+        if len(l_keys) > max_rows:
+            keep = np.sort(np.argsort(-last_used, kind='stable')[:max_rows])
+            print("FeatureCache : {} features evicted".format(len(l_keys) - max_rows),end='\n\n')
+            l_keys = [l_keys[i] for i in keep]
+            features = features[keep]
+            last_used = last_used[keep]
+
+        os.makedirs(self.path, exist_ok=True)
+
+        tmp_features = self.getFeaturesPath() + ".tmp.npy"
+        np.save(tmp_features, features)
+        os.replace(tmp_features, self.getFeaturesPath())
+
+        tmp_index = self.getIndexPath() + ".tmp"
+        with open(tmp_index, 'w') as f:
+            json.dump({'config' : self.config, 'keys' : l_keys, 'last_used' : last_used.tolist(), 'clock' : self.clock}, f)
+        os.replace(tmp_index, self.getIndexPath())
+
+        self.l_keys = l_keys
+        self.d_row = {key : i for i, key in enumerate(l_keys)}
+        self.features = features
+        self.last_used = last_used
+        self.l_new_keys, self.l_new_features = [], []
@@ -11,6 +11,7 @@ FeatureLoader Module
 """
 
 from sklearn.decomposition import PCA
+import numpy as np
 
 class FeatureLoader:
   """
@@ -38,6 +39,13 @@ class FeatureLoader:
     """
     return self.pca
 
+  def getConfig(self):
+    """
+    :return: the configuration which defines the features returned by self
+    :rtype: dict
+    """
+    return {'extractor' : 'singular_values', 'n_components' : self.getPCA().n_components}
+
   def getFeaturesFrom(self, img):
     """
     return the singular values of shape n_components of the given matrix image
@@ -50,4 +58,70 @@ class FeatureLoader:
     :rtype: ndarray
     """
     self.getPCA().fit(img)
-    return self.getPCA().singular_values_
\ No newline at end of file
+    return self.getPCA().singular_values_
+
+  def getFeaturesFromBatch(self, imgs, batch_size=1024):
+    """
+    return the singular values of shape n_components of each matrix image of the given stack,
+    numerically equivalent to getFeaturesFrom called on each image.
+
+    Like the PCA, each image is centered by column then the singular values of all the images
+    are computed by one batched call of numpy.linalg.svd by batch of batch_size images.
+
+    :param imgs: a stack of matrix images
+    :param batch_size: number of images given at a time to numpy.linalg.svd
+    :type imgs: ndarray of shape (N, H, W)
+    :type batch_size: int
+
+    :return: ndarray of shape (N, self.pca.n_components) that contains the singular values of each matrix image
+    :rtype: ndarray
+
+    :UC: len(imgs.shape) == 3 & self.pca.n_components <= min(H, W)
+    """
+    imgs = np.asarray(imgs)
+    assert(len(imgs.shape) == 3)
+
+    n_components = self.getPCA().n_components
+    features = np.empty((imgs.shape[0], n_components), dtype=np.float64)
+
+    for start in range(0, imgs.shape[0], batch_size):
+      X = imgs[start:start + batch_size].astype(np.float64)
+      X -= X.mean(axis=1, keepdims=True)
+      features[start:start + batch_size] = np.linalg.svd(X, compute_uv=False)[:, :n_components]
+
+    return features
+
+  def getFeaturesFromImages(self, l_img):
+    """
+    return the features of a list of matrix images of any shape: the images are grouped by shape and the features
+    of each group are given by one call of getFeaturesFromBatch. An image which is not a 2d matrix of at least
+    n_components pixels by side, or whose group fails, gets an error message instead of features.
+
+    :param l_img: list of matrix images, None for the missing images
+    :type l_img: list
+
+    :return: (ndarray of shape (len(l_img), self.pca.n_components) of the features of each image, a line of nan for the
+             images which are None or have an error, and the list of the error message of each image, None if it has none)
+    :rtype: tuple
+    """
+    n_components = self.getPCA().n_components
+    features = np.full((len(l_img), n_components), np.nan)
+    errors = [None] * len(l_img)
+
+    d_shape = {}
+    for i, img in enumerate(l_img):
+      if img is None:
+        continue
+      if np.ndim(img) != 2 or min(np.shape(img)) < n_components:
+        errors[i] = "image of shape {} is not a matrix of at least {}x{} pixels for {} features".format(np.shape(img), n_components, n_components, n_components)
+      else:
+        d_shape.setdefault(np.shape(img), []).append(i)
+
+    for shape, l_index in d_shape.items():
+      try:
+        features[l_index] = self.getFeaturesFromBatch(np.stack([l_img[i] for i in l_index]))
+      except Exception as e: # only the images of this shape are lost
+        for i in l_index:
+          errors[i] = str(e)
+
+    return features, errors
\ No newline at end of file
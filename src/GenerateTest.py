@@ -11,8 +11,8 @@ GenerateTest Module
 """
 
 import numpy as np
-import random
-import matplotlib.pyplot as plt 
+from Renderer import Renderer
+from Profiler import profiler
 
 class GenerateTest:
   """
@@ -33,9 +33,24 @@ class GenerateTest:
     self.dl = dataloader
     self.hpt = hpt
     self.cl = cl
+    self.renderer = Renderer()
+    self.montage = False
 
     self.initDict()
 
+  def setRenderer(self,renderer,montage=False):
+    """
+    :param renderer: the Renderer which writes the test images
+    :param montage: if True all the test images are tiled in one montage instead of one figure by image
+    :type renderer: Renderer
+    :type montage: bool
+
+    :return: none
+    :side effect: the test images will be written by the given renderer
+    """
+    self.renderer = renderer
+    self.montage = montage
+
   def initDict(self):
     """
     initialize the needed dictionnaries for test generation
@@ -83,60 +98,80 @@ class GenerateTest:
       self.d_test['found'][cat].append(img)
       self.d_label['found'][cat].append(cat)
 
+  def selectExamples(self,evaluation,order):
+    """
+    give to verifySupposedCategorie() the first found and fail examples, in the given order, of
+    each categorie which still needs some. The examples are selected with array masks on the
+    predictions of the given Evaluation.
+
+    :param evaluation: the Evaluation of a mlp on the current section
+    :param order: order in which the samples of the evaluation are looked at
+    :type evaluation: Evaluation
+    :type order: ndarray
+
+    :return: none
+    """
+    supposed, expected, rows = evaluation.getSupposed(), evaluation.getExpected(), evaluation.getRows()
+
+    for cat in self.cl.getCategories():
+      samples = order[expected[order] == cat]
+
+      for key, mask in (('found', supposed[samples] == cat), ('fail', supposed[samples] != cat)):
+        need = 0 if self.d_check[key][self.d_cat_index[cat]] else 2 - len(self.d_test[key][cat])
+
+        for i in samples[mask][:need]:
+          self.verifySupposedCategorie(self.dl[rows[i]][0],supposed[i],cat)
+
+  @profiler.stage("rendering")
   def generateImageTest(self):
     """
-    Generate test image in directory data/res/found and data/res/fail by using matplotlib.pyplot
+    Generate test image in directory data/res/found and data/res/fail with the Renderer of self
 
     For found tests this show the image and the supposed categorie of the mlp for the image
     
     Otherwise for the fail tests of mlp this show image, the supposed categorie of the mlp
     and the categorie of the image saved during the preprocessing which is the right one.
 
+    In montage mode all the found and fail tests are tiled in data/res/montage.png and their
+    titles are written in data/res/montage.json
+
     :return: none
     """
     print("GenerateTest.generateImageTest STARTING...",end='\n\n')
-    found,fail = 0,0
+    l_found, l_fail = [], []
 
     for cat in self.cl.getCategories():
-      try:
-        fig, ax = plt.subplots(figsize=(4,4))
-        ax.imshow(self.d_test['found'][cat][0])
-        ax.titlesize = 80
-        ax.set_title('MLP Found :\n {}'.format(self.d_label['found'][cat][0]))
-        ax.axis('off')
-        plt.tight_layout()
-        plt.savefig('data/res/found/found_{}.png'.format(found))
-        plt.close()
-        found += 1
-      except:
+      if len(self.d_test['found'][cat]) > 0:
+        l_found.append(('found_{}'.format(len(l_found)), self.d_test['found'][cat][0], 'MLP Found :\n {}'.format(self.d_label['found'][cat][0])))
+      else:
         print('except found -> {}'.format(cat))
-        continue
-      try:
-        fig, ax = plt.subplots(figsize=(4,4))
-        ax.imshow(self.d_test['fail'][cat][0])
-        ax.titlesize = 80
-        ax.set_title('MLP Fail\nSupposed : {}\nExpected : {}'.format(self.d_label['f_sup'][cat][0],self.d_label['f_expec'][cat][0]))
-        ax.axis('off')
-        plt.tight_layout()
-        plt.savefig('data/res/fail/fail_{}.png'.format(fail))
-        plt.close()
-        fail += 1
-      except:
+      if len(self.d_test['fail'][cat]) > 0:
+        l_fail.append(('fail_{}'.format(len(l_fail)), self.d_test['fail'][cat][0], 'MLP Fail\nSupposed : {}\nExpected : {}'.format(self.d_label['f_sup'][cat][0],self.d_label['f_expec'][cat][0])))
+      else:
         print('except fail -> {}'.format(cat))
-        continue
 
-    print("GenerateTest.generateImageTest -> folder : data/res/found & data/res/fail",end='\n\n')
+    if self.montage:
+      l_files = self.renderer.montage(l_found + l_fail, 'data/res/montage.png')
+      print("GenerateTest.generateImageTest -> files : {}".format(" & ".join(l_files)),end='\n\n')
+    else:
+      self.renderer.render([('data/res/found/{}.png'.format(name), img, title) for name, img, title in l_found] +
+                           [('data/res/fail/{}.png'.format(name), img, title) for name, img, title in l_fail])
+      print("GenerateTest.generateImageTest -> folder : data/res/found & data/res/fail",end='\n\n')
+
+    profiler.count("figures_rendered", len(l_found) + len(l_fail))
 
+  @profiler.stage("testing")
   def startTest(self,select):
     """
     Start a test session for the slice of mlp in the sub list hpt[select:]
     in range of total number of data categories.
 
     Until we found a found and fail examples for each data categories of this slice of mlp
-    we iterate on dataloader to get the tuple (img,features,cat) and we use the lda of the current
-    mlp used in hpt[select:] list to transform the features and use them in the predict method of mlp.
+    we take the validation Evaluation of the current mlp used in hpt[select:] list, which holds
+    its predictions on the valid section of its categories, so nothing is predicted again.
 
-    Then we give the predict method return to the call of verifySupposedCategorie() with img and cat.
+    Then the examples are picked in a random order of the evaluation by selectExamples() which
+    gives them to verifySupposedCategorie().
 
     Finally the call the generateImageTest() method which generate the image of the results of the tests
 
@@ -148,22 +183,14 @@ class GenerateTest:
     print("GenerateTest.startTest STARTING...",end='\n\n')
 
     self.dl.setSection("valid")
-
-    l_mlp = self.getHpt().getMLPList()[select:]
     
     for h in range(self.getHpt().max_layer // self.getHpt().min_layer):
       if (np.array(self.d_check['found']).all() and np.array(self.d_check['fail']).all()):
         break
       else:
-        mlp, lda = l_mlp[h]
-        len_dl = len(self.dl.getDictCategoriesIndex()[self.dl.getSection()])
-
-        for i in range(len_dl):
-          (img, f, cat) = self.dl[random.randint(0,len_dl-1)]
-          features = lda.transform(f.reshape(1,32))
-          supposed = mlp.predict(features.reshape(-1,1))
+        evaluation = self.getHpt().getEvaluation(select + h)
 
-          self.verifySupposedCategorie(img,supposed[0],cat)
+        self.selectExamples(evaluation, np.random.permutation(len(evaluation.getRows())))
     
     print("\t TEST DONE !",end='\n\n')
 
@@ -11,9 +11,134 @@ HyperparameterTuning Module
 """
 
 from sklearn.neural_network import MLPClassifier
+from sklearn.exceptions import ConvergenceWarning
+from concurrent.futures import ProcessPoolExecutor
+from SharedFeatures import SharedFeatures, attach, getSubset, getSubsetRows
+from Evaluation import evaluate
+from TuningJournal import TuningJournal
+from ModelStore import ModelStore, modelKey
 import numpy as np
 import TrainingModel
+from Profiler import profiler
+from math import ceil
+import warnings
 import random
+import time
+
+worker_data = None
+
+def initTrialWorker(spec):
+    """
+    :param spec: the description of the shared features given by SharedFeatures.getSpec()
+    :type spec: dict
+
+    :return: none
+    :side effect: attach the worker process to the shared features
+    """
+    global worker_data
+    worker_data = attach(spec)
+
+def runTrial(trial):
+    """
+    Train in a worker process the given mlp on the given categories like TrainingModel.train,
+    with the features shared by the HyperparameterTuning
+
+    :param trial: couple (mlp, categories)
+    :type trial: tuple
+
+    :return: (the fitted mlp, the LinearDiscriminantAnalysis, the train Evaluation, the validation Evaluation, the fit time in seconds)
+    :rtype: tuple
+    """
+    mlp, sub_cat = trial
+    start = time.perf_counter()
+
+    train_features, train_cat = getSubset(worker_data, sub_cat, 'train')
+    valid_features, valid_cat = getSubset(worker_data, sub_cat, 'valid')
+
+    lda, train_features, valid_features = TrainingModel.fitProjection(train_features, train_cat, valid_features)
+    t, v = TrainingModel.fitAndEvaluate(mlp, train_features, train_cat, valid_features, valid_cat,
+                                        getSubsetRows(worker_data, sub_cat, 'train'), getSubsetRows(worker_data, sub_cat, 'valid'))
+
+    return mlp, lda, t, v, time.perf_counter() - start
+
+def buildFolds(labels, codes, k, seed=0):
+    """
+    Split the rows of the given categorie codes in k stratified folds: the rows of each categorie
+    are shuffled and spread evenly on the folds.
+
+    :param labels: the categorie code of each row of the feature matrix
+    :param codes: the categorie codes of the rows to split
+    :param k: number of folds
+    :param seed: seed of the shuffle
+    :type labels: ndarray
+    :type codes: list
+    :type k: int
+    :type seed: int
+
+    :return: list of the k couples (sorted train rows, sorted validation rows) of the folds
+    :rtype: list
+
+    :UC: k > 1
+    """
+    assert(k > 1)
+
+    rng = np.random.default_rng(seed)
+    l_parts = [[] for _ in range(k)]
+
+    for code in sorted(codes):
+        rows = rng.permutation(np.flatnonzero(labels == code))
+        for j, part in enumerate(np.array_split(rows, k)):
+            l_parts[j].append(part)
+
+    l_valid = [np.sort(np.concatenate(parts)) for parts in l_parts]
+
+    return [(np.sort(np.concatenate([l_valid[i] for i in range(k) if i != j])), l_valid[j]) for j in range(k)]
+
+def getFoldRows(data, rows):
+    """
+    :param data: the features arrays, given by attach() or with the same keys
+    :param rows: sorted rows of the feature matrix of the train section followed by the valid section
+    :type data: dict
+    :type rows: ndarray
+
+    :return: the features of the given rows and the categorie name of each row
+    :rtype: (ndarray, ndarray)
+    """
+    n_train = len(data['train']['labels'])
+    train_rows, valid_rows = rows[rows < n_train], rows[rows >= n_train] - n_train
+
+    features = np.concatenate([data['train']['features'][train_rows], data['valid']['features'][valid_rows]])
+    labels = np.concatenate([data['train']['labels'][train_rows], data['valid']['labels'][valid_rows]])
+
+    return features, np.array(data['categories'])[labels]
+
+def runFold(job, data=None):
+    """
+    Fit like TrainingModel.train an LDA and the given mlp on the train rows of a fold and evaluate it on its validation rows,
+    or like TrainingModel.trainStreaming with partial_fit when the streaming parameters are given
+
+    :param job: tuple (mlp, train rows, validation rows, streaming parameters or None), the rows are given like in getFoldRows
+    :param data: the features arrays, None in a worker process to use the shared features
+    :type job: tuple
+    :type data: dict
+
+    :return: (the train accuracy, the validation accuracy, the fit time in seconds) of the fold
+    :rtype: tuple
+    """
+    mlp, train_rows, valid_rows, streaming = job
+    data = worker_data if data is None else data
+    start = time.perf_counter()
+
+    train_features, train_cat = getFoldRows(data, train_rows)
+    valid_features, valid_cat = getFoldRows(data, valid_rows)
+
+    if streaming is None:
+        lda, train_features, valid_features = TrainingModel.fitProjection(train_features, train_cat, valid_features)
+        t, v = TrainingModel.fitAndEvaluate(mlp, train_features, train_cat, valid_features, valid_cat)
+    else:
+        t, v, lda = TrainingModel.fitAndEvaluateStreaming(mlp, train_features, train_cat, valid_features, valid_cat, **streaming)
+
+    return t.getAccuracy(), v.getAccuracy(), time.perf_counter() - start
 
 class HyperparameterTuning:
     
@@ -40,6 +165,151 @@ class HyperparameterTuning:
         self.random_accuracy = [1/n for n in range(2,self.len_cat + 1)]
         self.min_layer = 8
         self.max_layer = 32
+        self.streaming = None
+        self.workers = 0
+        self.pruned = []
+        self.journal = None
+        self.journal_key = None
+        self.halving_report = None
+        self.l_categories = []
+        self.evaluations = []
+        self.cv_results = None
+
+    def setWorkers(self, workers):
+        """
+        :param workers: number of worker processes which train the mlp of the grid search, 0 to train them in the current process
+        :type workers: int
+
+        :return: none
+        :side effect: the trials of the grid search will be spread on a pool of the given number of processes
+        """
+        assert(workers >= 0)
+        self.workers = workers
+
+    def setStreaming(self, epochs, batch_size):
+        """
+        :param epochs: number of passes on the train section of each trained mlp, None to fit the mlp on the full feature matrix
+        :param batch_size: number of rows of each mini-batch
+        :type epochs: int
+        :type batch_size: int
+
+        :return: none
+        :side effect: the mlp of the grid search will be trained by TrainingModel.trainStreaming with the given parameters
+        """
+        self.streaming = None if epochs is None else {'epochs' : epochs, 'batch_size' : batch_size}
+
+    def setJournal(self, path, key=None):
+        """
+        :param path: path of the folder of the TuningJournal to use, None to not use any journal
+        :param key: key of the dataset and of the configuration of the trials, see ModelStore.modelKey
+        :type path: str
+        :type key: str
+
+        :return: none
+        :side effect: the finished trials of startIterate will be written in the journal of the given folder with the
+                      given key, and the trials already in the journal with the same key will not be trained again
+        """
+        self.journal = None if path is None else TuningJournal(path)
+        self.journal_key = key
+
+    def getConfig(self):
+        """
+        :return: the hyperparameters of the grid search which change the trained mlp
+        :rtype: dict
+        """
+        return {'min_layer' : self.min_layer,
+                'max_layer' : self.max_layer,
+                'streaming' : self.streaming,
+                'mlp' : {k : v for k, v in self.createMLP(self.min_layer).get_params().items() if k != 'hidden_layer_sizes'}}
+
+    def getCategoriesList(self):
+        """
+        :return: the list of the categories on which each mlp of getMLPList() has been trained
+        :rtype: list
+        """
+        return self.l_categories
+
+    def getBestMLP(self, nb_cat):
+        """
+        :param nb_cat: number of categories of the wanted mlp
+        :type nb_cat: int
+
+        :return: the (mlp, lda) couple with the best validation accuracy among the ones trained on nb_cat categories
+        :rtype: tuple
+
+        :UC: an mlp of the grid search has been trained on nb_cat categories
+        """
+        l_index = [k for k, sub_cat in enumerate(self.l_categories) if len(sub_cat) == nb_cat]
+        assert(len(l_index) > 0)
+
+        return self.getMLPList()[max(l_index, key=lambda k: self.valid_accuracy[k])]
+
+    def getEvaluation(self, k):
+        """
+        :param k: index of the mlp in getMLPList()
+        :type k: int
+
+        :return: the validation Evaluation of the k-th mlp on its categories, it is computed once for the
+                 mlp read back from a journal or a ModelStore
+        :rtype: Evaluation
+        """
+        if self.evaluations[k] is None:
+            mlp, lda = self.getMLPList()[k]
+            valid_features, valid_cat = self.dl.convergeFeatures(self.l_categories[k], 'valid')
+            self.evaluations[k] = evaluate(mlp, lda.transform(valid_features), valid_cat, self.dl.getSubsetRows(self.l_categories[k], 'valid'))
+
+        return self.evaluations[k]
+
+    def saveModels(self, path, fingerprint, config):
+        """
+        :param path: path of the folder of the ModelStore
+        :param fingerprint: fingerprint of the dataset, see MatrixLoader.getFingerprint()
+        :param config: the hyperparameters and the feature configuration of the models
+        :type path: str
+        :type fingerprint: str
+        :type config: dict
+
+        :return: none
+        :side effect: save every (mlp, lda) couple of the grid search with its categories and accuracies in the ModelStore
+        """
+        l_meta = []
+        for k, (mlp, lda) in enumerate(self.getMLPList()):
+            l_meta.append({'nb_cat' : len(self.l_categories[k]),
+                           'hidden_layer' : mlp.hidden_layer_sizes[0],
+                           'categories' : [str(cat) for cat in self.l_categories[k]],
+                           'train_accuracy' : self.train_accuracy[k],
+                           'valid_accuracy' : self.valid_accuracy[k],
+                           'pruned' : self.pruned[k] if k < len(self.pruned) else False})
+
+        ModelStore(path).save(modelKey(fingerprint, config), fingerprint, config, self.getMLPList(), l_meta)
+
+    def loadModels(self, path, fingerprint, config):
+        """
+        :param path: path of the folder of the ModelStore
+        :param fingerprint: fingerprint of the dataset, see MatrixLoader.getFingerprint()
+        :param config: the hyperparameters and the feature configuration of the models
+        :type path: str
+        :type fingerprint: str
+        :type config: dict
+
+        :return: True if the models of the given dataset and configuration have been found in the ModelStore
+        :rtype: bool
+        :side effect: fill the lists of self like startIterate with the found models, their categories and accuracies
+        """
+        found = ModelStore(path).load(modelKey(fingerprint, config), fingerprint, config)
+
+        if found is None:
+            return False
+
+        l_mlp, meta = found
+        self.l_mlp = [tuple(couple) for couple in l_mlp]
+        self.l_categories = [record['categories'] for record in meta['models']]
+        self.train_accuracy = [record['train_accuracy'] for record in meta['models']]
+        self.valid_accuracy = [record['valid_accuracy'] for record in meta['models']]
+        self.pruned = [record['pruned'] for record in meta['models']]
+        self.evaluations = [None] * len(self.l_mlp)
+
+        return True
 
     def getMLPList(self):
         """
@@ -55,6 +325,7 @@ class HyperparameterTuning:
         """
         return self.random_accuracy[i]
 
+    @profiler.stage("tuning")
     def startIterate(self):
         """
         This method will start iterate on [2,3,..,n] where n = total number of data categories
@@ -68,31 +339,333 @@ class HyperparameterTuning:
         We print and save the accuracy for train and valid section and random accuracy in function of 
         the number of categories.
 
+        The trials can be trained in parallel by a pool of processes (see setWorkers), the results
+        are the same and in the same order.
+
+        When a journal is set (see setJournal) each finished trial is appended to it, and the trials
+        found in it with the same key and configuration are read back instead of being trained.
+
         :return: none
         """
 
         print("HyperparameterTuning.start_iterate STARTED...",end='\n\n')
         print("\tTRAIN & VALIDATION ACCURACY RUN:\n")
 
+        # the random subsets are drawn before any training, in the order of the grid
+        l_trials = []
         for i in range(2,self.len_cat + 1):
-            print("\n\t\tNB_CAT {} :".format(i),end='\n\n')
-
             for hidden_layer in range(self.min_layer, (self.max_layer + self.min_layer), self.min_layer):
-                res = (0,0)
-                
                 sub_cat = self.categories if (i == self.len_cat) else np.random.choice(self.categories, i, replace=False)
+                l_trials.append((i, hidden_layer, sub_cat))
 
-                mlp = MLPClassifier(solver='adam', hidden_layer_sizes=(hidden_layer, hidden_layer), random_state=1,max_iter=10000, warm_start=True, early_stopping=True)
+        if self.journal is not None:
+            self.journal.load()
+            l_done = [self.journal.find(k, i, hidden_layer, self.journal_key) for k, (i, hidden_layer, sub_cat) in enumerate(l_trials)]
+            print("\tRESUMED {} TRIALS FROM JOURNAL -> {}".format(sum(record is not None for record in l_done), self.journal.path),end='\n')
+        else:
+            l_done = [None] * len(l_trials)
 
-                t, v, lda = TrainingModel.train(mlp, self.dl, sub_cat)
+        pending = self.runTrials([trial for trial, record in zip(l_trials, l_done) if record is None])
+
+        try:
+            for k, ((i, hidden_layer, sub_cat), record) in enumerate(zip(l_trials, l_done)):
+                if hidden_layer == self.min_layer:
+                    print("\n\t\tNB_CAT {} :".format(i),end='\n\n')
+
+                if record is not None:
+                    mlp, lda = self.journal.loadModel(record, self.journal_key)
+                    t, v, sub_cat = record['train_accuracy'], record['valid_accuracy'], record['categories']
+                    evaluation = None
+                else:
+                    mlp, lda, train_evaluation, evaluation, fit_s = next(pending)
+                    t, v = train_evaluation.getAccuracy(), evaluation.getAccuracy()
+                    if self.journal is not None:
+                        self.journal.append(k, i, hidden_layer, sub_cat, mlp, lda, t, v, fit_s, self.journal_key)
 
                 res = (t, v)
                 self.getMLPList().append((mlp, lda))
+                self.l_categories.append(list(sub_cat))
+                self.evaluations.append(evaluation)
+                profiler.count("trials")
 
                 self.train_accuracy.append(res[0])
                 self.valid_accuracy.append(res[1])
 
                 print("\t\t\t\ttrain {} valid {} rand {} -> {}".format(res[0], res[1], self.getRandomAccuracy(i-2),sub_cat),end='\n')
+        finally:
+            pending.close() # release the pool of workers, also when a trial or the journal fails
                 
         print("\nHyperparameterTuning.start_iterate DONE",end='\n\n')
 
+    @profiler.stage("tuning")
+    def startSuccessiveHalving(self, min_iter=10, eta=2):
+        """
+        Adaptive version of startIterate. For each number of categories n in [2,3,..,n] one random
+        choice of n categories is done (all categories at the last iteration) and the mlp of every
+        hidden layer size are trained on it for min_iter iterations. Only the best 1/eta of them by
+        validation accuracy are kept, and trained again, with the warm start of the mlp, until
+        eta times more iterations. The last one is trained until convergence like in startIterate.
+
+        The pruned mlp are saved with their last accuracies so the lists keep the order of
+        startIterate. The number of pruned trials and the saved iterations are printed and kept
+        in halving_report.
+
+        The rounds are warm started full-batch fits in the current process: setWorkers() and
+        setStreaming() are not supported, main.py refuses --halving with --tuning-workers or --streaming.
+
+        :param min_iter: number of iterations of the first round
+        :param eta: inverse of the portion of mlp kept at each round
+        :type min_iter: int
+        :type eta: int
+
+        :return: none
+
+        :UC: min_iter > 0 & eta > 1 & self.workers == 0 & self.streaming is None
+        """
+        assert(min_iter > 0 and eta > 1)
+        assert(self.workers == 0 and self.streaming is None)
+
+        print("HyperparameterTuning.startSuccessiveHalving STARTED...",end='\n\n')
+        print("\tTRAIN & VALIDATION ACCURACY RUN:\n")
+
+        l_hidden = list(range(self.min_layer, (self.max_layer + self.min_layer), self.min_layer))
+        max_iter = self.createMLP(self.min_layer).max_iter
+
+        n_pruned, pruned_iter, spent_iter, l_final_iter = 0, 0, 0, []
+        start = time.perf_counter()
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=ConvergenceWarning) # the first rounds never converge
+
+            for i in range(2,self.len_cat + 1):
+                print("\n\t\tNB_CAT {} :".format(i),end='\n\n')
+
+                sub_cat = self.categories if (i == self.len_cat) else np.random.choice(self.categories, i, replace=False)
+                lda, train_features, train_cat, valid_features, valid_cat = TrainingModel.project(self.dl, sub_cat)
+                train_rows, valid_rows = self.dl.getSubsetRows(sub_cat, 'train'), self.dl.getSubsetRows(sub_cat, 'valid')
+
+                d_trial = {h : {'mlp' : self.createMLP(h), 'iter' : 0, 'res' : None, 'pruned' : False} for h in l_hidden}
+                alive = list(l_hidden)
+                budget = min_iter
+
+                while True:
+                    final = (len(alive) == 1) or (budget >= max_iter)
+
+                    for h in alive:
+                        trial = d_trial[h]
+                        mlp = trial['mlp']
+                        mlp.max_iter = (max_iter - trial['iter']) if final else (budget - trial['iter'])
+
+                        # loss_curve_ keeps one loss by iteration across the warm started fits
+                        before = len(getattr(mlp, 'loss_curve_', []))
+                        trial['res'] = TrainingModel.fitAndEvaluate(mlp, train_features, train_cat, valid_features, valid_cat, train_rows, valid_rows)
+                        trial['iter'] += len(mlp.loss_curve_) - before
+                        spent_iter += len(mlp.loss_curve_) - before
+
+                        mlp.max_iter = max_iter
+
+                    if final:
+                        l_final_iter += [d_trial[h]['iter'] for h in alive]
+                        break
+
+                    n_keep = max(1, ceil(len(alive) / eta))
+                    ranked = sorted(alive, key=lambda h: -d_trial[h]['res'][1].getAccuracy())
+
+                    for h in ranked[n_keep:]:
+                        d_trial[h]['pruned'] = True
+                        n_pruned += 1
+                        pruned_iter += d_trial[h]['iter']
+
+                    alive = [h for h in alive if h in ranked[:n_keep]]
+                    budget *= eta
+
+                for h in l_hidden:
+                    res = (d_trial[h]['res'][0].getAccuracy(), d_trial[h]['res'][1].getAccuracy())
+                    self.getMLPList().append((d_trial[h]['mlp'], lda))
+                    self.l_categories.append(list(sub_cat))
+                    self.evaluations.append(d_trial[h]['res'][1])
+                    self.pruned.append(d_trial[h]['pruned'])
+                    profiler.count("trials")
+
+                    self.train_accuracy.append(res[0])
+                    self.valid_accuracy.append(res[1])
+
+                    print("\t\t\t\ttrain {} valid {} rand {} iter {}{} -> {}".format(res[0], res[1], self.getRandomAccuracy(i-2), d_trial[h]['iter'], " (pruned)" if d_trial[h]['pruned'] else "", sub_cat),end='\n')
+
+        # a full grid would train every mlp until convergence, which is estimated by the mean of the mlp trained until the end
+        full_iter = len(self.getMLPList()) * float(np.mean(l_final_iter))
+        self.halving_report = {'trials' : len(self.getMLPList()),
+                               'pruned' : n_pruned,
+                               'pruned_iter' : pruned_iter,
+                               'iter' : spent_iter,
+                               'estimated_full_iter' : full_iter,
+                               'saved' : 1 - spent_iter / full_iter if full_iter > 0 else 0,
+                               'fit_s' : time.perf_counter() - start}
+        profiler.count("trials_pruned", n_pruned)
+
+        print("\n\tPRUNED {pruned}/{trials} TRIALS, {iter} ITERATIONS FOR AN ESTIMATED {estimated_full_iter:.0f} WITH THE FULL GRID -> {saved:.1%} SAVED IN {fit_s:.2f}s".format(**self.halving_report),end='\n')
+        print("\nHyperparameterTuning.startSuccessiveHalving DONE",end='\n\n')
+
+    def getCrossValidation(self):
+        """
+        :return: the results of startCrossValidation for each mlp of getMLPList(), None if it has not been run
+        :rtype: list
+        """
+        return self.cv_results
+
+    @profiler.stage("cross_validation")
+    def startCrossValidation(self, k=5, seed=0):
+        """
+        Evaluate by k-fold cross-validation the configuration (categories, hidden layer size) of each mlp
+        of the grid search. The train and valid sections of the DataLoader are put together and split in k
+        stratified folds by index arrays over the features already extracted, so nothing is read or
+        extracted again. For each fold an LDA and a new mlp are fitted like the grid search, with
+        TrainingModel.train or with partial_fit like TrainingModel.trainStreaming (see setStreaming), in the
+        current process or by the pool of self.workers processes which read the shared features.
+
+        After successive halving the folds are fitted until convergence, while the single split accuracy
+        of a pruned mlp comes from its truncated training, which is printed.
+
+        :param k: number of folds
+        :param seed: seed of the folds
+        :type k: int
+        :type seed: int
+
+        :return: none
+        :side effect: fill cv_results with, for each mlp, its categories, hidden layer size, the validation accuracy
+                      of each fold, their mean and standard deviation and the mean train accuracy
+
+        :UC: k > 1 & the grid search has been run or loaded
+        """
+        assert(k > 1 and len(self.getMLPList()) > 0)
+
+        print("HyperparameterTuning.startCrossValidation STARTED...",end='\n\n')
+        print("\t{}-FOLD CROSS VALIDATION RUN:\n".format(k))
+        if self.streaming is not None:
+            print("\tFOLDS FITTED WITH partial_fit LIKE THE GRID ({epochs} epochs, batch {batch_size})\n".format(**self.streaming))
+        elif any(self.pruned):
+            print("\tFOLDS FITTED UNTIL CONVERGENCE, THE SINGLE SPLIT ACCURACY OF THE PRUNED MLP COMES FROM THEIR TRUNCATED TRAINING\n")
+        else:
+            print("\tFOLDS FITTED ON THE FULL BATCH LIKE THE GRID\n")
+
+        categories = list(self.dl.getCategories())
+        labels = np.concatenate([self.dl.getDictionnaryLabels()['train'], self.dl.getDictionnaryLabels()['valid']])
+
+        l_jobs = []
+        for sub_cat, (mlp, lda) in zip(self.l_categories, self.getMLPList()):
+            codes = [categories.index(cat) for cat in sub_cat]
+            l_jobs += [(self.createMLP(mlp.hidden_layer_sizes[0]), train_rows, valid_rows, self.streaming) for train_rows, valid_rows in buildFolds(labels, codes, k, seed)]
+
+        l_res = list(self.runFolds(l_jobs))
+
+        self.cv_results = []
+        for n, (sub_cat, (mlp, lda)) in enumerate(zip(self.l_categories, self.getMLPList())):
+            folds = l_res[n * k:(n + 1) * k]
+            valid = [v for t, v, fit_s in folds]
+
+            self.cv_results.append({'nb_cat' : len(sub_cat),
+                                    'hidden_layer' : mlp.hidden_layer_sizes[0],
+                                    'categories' : [str(cat) for cat in sub_cat],
+                                    'folds' : valid,
+                                    'mean' : float(np.mean(valid)),
+                                    'std' : float(np.std(valid)),
+                                    'train_mean' : float(np.mean([t for t, v, fit_s in folds])),
+                                    'fit_s' : sum(fit_s for t, v, fit_s in folds)})
+            profiler.count("folds", k)
+
+            print("\t\t\t\tnb_cat {nb_cat} hidden {hidden_layer} : train {train_mean:.3f} valid {mean:.3f} +/- {std:.3f}".format(**self.cv_results[-1])
+                  + " (single split {:.3f}{}) -> {}".format(self.valid_accuracy[n], ", pruned" if n < len(self.pruned) and self.pruned[n] else "", self.cv_results[-1]['categories']),end='\n')
+
+        print("\nHyperparameterTuning.startCrossValidation DONE",end='\n\n')
+
+    def runFolds(self, l_jobs):
+        """
+        Generator of the results of the given folds, in the same order. The folds are fitted in the current
+        process, or by a pool of self.workers processes which read the features of the DataLoader from shared memory.
+
+        :param l_jobs: list of tuples (mlp, train rows, validation rows, streaming parameters or None), see runFold
+        :type l_jobs: list
+
+        :return: generator of tuples (train accuracy, validation accuracy, fit time in seconds)
+        :rtype: generator
+        """
+        if self.workers == 0:
+            data = {'categories' : list(self.dl.getCategories())}
+            for section in ['train', 'valid']:
+                data[section] = {'features' : self.dl.getDictionnaryFeatures()[section], 'labels' : self.dl.getDictionnaryLabels()[section]}
+
+            for job in l_jobs:
+                yield runFold(job, data)
+            return
+
+        shared = SharedFeatures(self.dl)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=initTrialWorker, initargs=(shared.getSpec(),)) as executor:
+                yield from executor.map(runFold, l_jobs)
+        finally:
+            shared.close()
+
+    def createMLP(self, hidden_layer):
+        """
+        :param hidden_layer: size of the two hidden layers
+        :type hidden_layer: int
+
+        :return: a MLPClassifier of the grid search for the given hidden layer size
+        :rtype: MLPClassifier
+        """
+        # partial_fit does not support early stopping, and with warm_start it refuses a mini-batch without every class
+        return MLPClassifier(solver='adam', hidden_layer_sizes=(hidden_layer, hidden_layer), random_state=1,max_iter=10000,
+                             warm_start=(self.streaming is None), early_stopping=(self.streaming is None))
+
+    def runTrials(self, l_trials):
+        """
+        Generator of the results of the given trials, in the same order. The trials are trained in the
+        current process, or by a pool of self.workers processes which read the features of the DataLoader
+        from shared memory. The mlp are created with random_state=1 so both ways give the same results.
+        The streaming trials read their mini-batches from the DataLoader, so they are only trained in the
+        current process, main.py refuses --streaming with --tuning-workers.
+
+        :param l_trials: list of tuples (number of categories, hidden layer size, categories)
+        :type l_trials: list
+
+        :return: generator of tuples (fitted mlp, LinearDiscriminantAnalysis, train Evaluation, validation Evaluation, fit time in seconds)
+        :rtype: generator
+
+        :UC: self.workers == 0 or self.streaming is None
+        """
+        assert(self.workers == 0 or self.streaming is None)
+
+        if len(l_trials) == 0:
+            return
+
+        if self.workers == 0:
+            for i, hidden_layer, sub_cat in l_trials:
+                mlp = self.createMLP(hidden_layer)
+                start = time.perf_counter()
+
+                if self.streaming is None:
+                    t, v, lda = TrainingModel.train(mlp, self.dl, sub_cat)
+                else:
+                    t, v, lda = TrainingModel.trainStreaming(mlp, self.dl, sub_cat, **self.streaming)
+
+                yield mlp, lda, t, v, time.perf_counter() - start
+            return
+
+        shared = SharedFeatures(self.dl)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=initTrialWorker, initargs=(shared.getSpec(),)) as executor:
+                l_args = [(self.createMLP(hidden_layer), list(sub_cat)) for i, hidden_layer, sub_cat in l_trials]
+                results = executor.map(runTrial, l_args)
+
+                try:
+                    while True:
+                        # each result is collected in the stage and yielded after it, so the work of the caller is not timed
+                        with profiler.stage("mlp_fit"):
+                            res = next(results, None)
+                        if res is None:
+                            break
+                        yield res
+                finally:
+                    results.close() # the trials not started yet are cancelled when the caller stops early
+        finally:
+            shared.close()
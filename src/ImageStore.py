@@ -0,0 +1,286 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`ImageStore` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+ImageStore Module
+
+"""
+
+import numpy as np
+import hashlib
+import json
+import os
+
+def hashFile(path):
+    """
+    :param path: path of a file
+    :type path: str
+
+    :return: the sha1 hexdigest of the content of the given file
+    :rtype: str
+    """
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+class ImageStore:
+    """
+    Create an ImageStore which keeps the decoded images of a MatrixLoader in a single
+    contiguous uint8 array of shape (N, H, W) on disk, with a manifest of the image paths,
+    their categorie, the split indices and the size, mtime and content hash of each file.
+
+    The array is memory-mapped when loaded, so the images are given back as views of the
+    file without any copy and the OS page cache is shared between concurrent runs.
+
+    A rescan of the image folders only decodes the new or changed files, drops the deleted
+    ones and keeps the train/valid split of the files that did not change.
+    """
+    VERSION = 2
+
+    def __init__(self, path):
+        """
+        :param path: path of the folder where the array and the manifest are stored
+        :type path: str
+        :build: an ImageStore associated to the given folder, nothing is read before load()
+
+        :UC: type(path) == str
+        """
+        assert(type(path) == str)
+
+        self.path = path
+        self.images = None
+        self.manifest = None
+
+    def getImagesPath(self):
+        """
+        :return: the path of the .npy file which contains the decoded images
+        :rtype: str
+        """
+        return os.path.join(self.path, "images.npy")
+
+    def getManifestPath(self):
+        """
+        :return: the path of the json manifest of the store
+        :rtype: str
+        """
+        return os.path.join(self.path, "manifest.json")
+
+    def getImages(self):
+        """
+        :return: the memory-mapped array of all the images of the store, None if not loaded
+        :rtype: numpy.memmap
+        """
+        return self.images
+
+    def getManifest(self):
+        """
+        :return: the manifest of the store, None if not loaded
+        :rtype: dict
+        """
+        return self.manifest
+
+    def load(self):
+        """
+        :return: True if a store has been found and memory-mapped, False otherwise
+        :rtype: bool
+        :side effect: read the manifest and memory-map the images array of the store
+        """
+        self.images, self.manifest = None, None
+
+        try:
+            with open(self.getManifestPath(), 'r') as f:
+                manifest = json.load(f)
+            images = np.load(self.getImagesPath(), mmap_mode='r')
+        except (OSError, ValueError):
+            return False
+
+        if manifest.get('version') != ImageStore.VERSION or images.shape[0] != manifest['size']:
+            return False
+
+        self.images, self.manifest = images, manifest
+        return True
+
+    def getCategoryImages(self, cat, section):
+        """
+        :param cat: the categorie
+        :param section: the section, 'train' or 'valid'
+        :type cat: str
+        :type section: str
+
+        :return: a view (no copy) of the images of the given categorie and section
+        :rtype: numpy.memmap
+
+        :UC: the store is loaded & section == 'train' or 'valid'
+        """
+        d_cat = self.manifest['categories'][cat]
+        start = d_cat['offset'] if section == 'train' else d_cat['offset'] + d_cat['train']
+
+        return self.images[start:start + d_cat[section]]
+
+    def getRow(self):
+        """
+        :return: a dictionnary which gives the row in the images array of each image path of the loaded store
+        :rtype: dict
+        """
+        d_row = {}
+        for d_cat in self.manifest['categories'].values():
+            for i, path in enumerate(d_cat['files']):
+                d_row[path] = d_cat['offset'] + i
+        return d_row
+
+    def rescan(self, d_img, validation_p, decode):
+        """
+        Compare the listed image paths with the manifest of the store. A file is unchanged
+        when its size and mtime are the ones of the manifest, or when its content hash is the
+        one of the manifest. Only the new and changed files are given to decode, the deleted
+        files are dropped.
+
+        The unchanged files keep their section, the new files fill the training section up to
+        validation_p of the categorie then go in the validation section.
+
+        :param d_img: dictionnary which contains the list of listed image paths by categorie
+        :param validation_p: portion of training images of each categorie
+        :param decode: function which returns the list of the decoded images of a list of paths
+        :type d_img: dict
+        :type validation_p: float
+        :type decode: function
+
+        :return: the dictionnary of image paths by categorie ordered by section (train then valid)
+                 and the dictionnary of the number of train and valid images by categorie
+        :rtype: (dict, dict)
+        :side effect: write the store again if a file has been added, changed or deleted
+        """
+        fresh = self.load() and self.manifest['validation_p'] == validation_p and list(self.manifest['categories']) == list(d_img)
+
+        d_old_cat = self.manifest['categories'] if fresh else {}
+        d_old_entries = self.manifest['entries'] if fresh else {}
+        d_old_row = self.getRow() if fresh else {}
+
+        d_order, d_endindex, d_entries = {}, {}, {}
+        l_decode = []
+        stats = {'unchanged' : 0, 'added' : 0, 'changed' : 0, 'deleted' : 0}
+
+        for cat in d_img:
+            l_files = d_img[cat]
+            s_files = set(l_files)
+
+            for path in l_files:
+                st = os.stat(path)
+                entry = {'size' : st.st_size, 'mtime' : st.st_mtime_ns}
+                old = d_old_entries.get(path)
+
+                if old is not None and old['size'] == entry['size'] and old['mtime'] == entry['mtime']:
+                    entry['sha1'] = old['sha1']
+                else:
+                    entry['sha1'] = hashFile(path)
+
+                if old is not None and old['sha1'] == entry['sha1']:
+                    stats['unchanged'] += 1
+                else:
+                    stats['changed' if old is not None else 'added'] += 1
+                    l_decode.append(path)
+
+                d_entries[path] = entry
+
+            if cat in d_old_cat:
+                old_files = d_old_cat[cat]['files']
+                old_train = d_old_cat[cat]['train']
+                stats['deleted'] += sum(1 for path in old_files if path not in s_files)
+                l_train = [path for path in old_files[:old_train] if path in s_files]
+                l_valid = [path for path in old_files[old_train:] if path in s_files]
+            else:
+                l_train, l_valid = [], []
+
+            kept = set(l_train) | set(l_valid)
+            l_new = [path for path in l_files if path not in kept]
+            n_train = max(0, min(len(l_new), int(len(l_files) * validation_p) - len(l_train)))
+
+            d_order[cat] = l_train + l_new[:n_train] + l_valid + l_new[n_train:]
+            d_endindex[cat] = {'train' : len(l_train) + n_train, 'valid' : len(l_files) - len(l_train) - n_train}
+
+        print("RESCAN -> unchanged {unchanged} added {added} changed {changed} deleted {deleted}".format(**stats),end='\n\n')
+
+        if fresh and stats['added'] == stats['changed'] == stats['deleted'] == 0:
+            if d_entries != d_old_entries: # some files have only been touched, their new mtime is saved
+                self.manifest['entries'] = d_entries
+                self.writeManifest(self.manifest)
+            return d_order, d_endindex
+
+        d_decoded = dict(zip(l_decode, decode(l_decode)))
+
+        l_matrix = []
+        for cat in d_order:
+            for path in d_order[cat]:
+                l_matrix.append(d_decoded[path] if path in d_decoded else np.array(self.images[d_old_row[path]]))
+
+        self.write(d_order, d_endindex, l_matrix, validation_p, d_entries)
+
+        return d_order, d_endindex
+
+    def writeManifest(self, manifest):
+        """
+        :param manifest: the manifest to write
+        :type manifest: dict
+
+        :return: None
+        :side effect: write the given manifest in the store folder under a temporary name then rename it
+        """
+        tmp_manifest = self.getManifestPath() + ".tmp"
+        with open(tmp_manifest, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, self.getManifestPath())
+
+    def write(self, d_img, d_endindex, l_matrix, validation_p, d_entries):
+        """
+        :param d_img: dictionnary which contains the list of image paths by categorie, ordered by section
+        :param d_endindex: dictionnary which contains the number of train and valid images by categorie
+        :param l_matrix: list of all the decoded images, in the order of d_img
+        :param validation_p: portion of training images of each categorie
+        :param d_entries: dictionnary which contains the size, mtime and sha1 of each image path
+        :type d_img: dict
+        :type d_endindex: dict
+        :type l_matrix: list
+        :type validation_p: float
+        :type d_entries: dict
+
+        :return: None
+        :side effect: write the images array and the manifest in the store folder then load them
+
+        :UC: all the matrix of l_matrix have the same shape
+        """
+        shape = l_matrix[0].shape if len(l_matrix) > 0 else (0, 0)
+        assert(all(m.shape == shape for m in l_matrix))
+
+        os.makedirs(self.path, exist_ok=True)
+
+        d_categories = {}
+        offset = 0
+        for cat in d_img:
+            d_categories[cat] = {'files' : d_img[cat],
+                                 'offset' : offset,
+                                 'train' : d_endindex[cat]['train'],
+                                 'valid' : d_endindex[cat]['valid']}
+            offset += len(d_img[cat])
+
+        # the files are written under a temporary name then renamed, so a concurrent run
+        # never memory-maps a partially written array
+        tmp_images = self.getImagesPath() + ".tmp.npy"
+        images = np.lib.format.open_memmap(tmp_images, mode='w+', dtype=np.uint8, shape=(len(l_matrix),) + tuple(shape))
+        for i, m in enumerate(l_matrix):
+            images[i] = m
+        images.flush()
+        del images
+
+        os.replace(tmp_images, self.getImagesPath())
+
+        self.writeManifest({'version' : ImageStore.VERSION,
+                            'size' : len(l_matrix),
+                            'shape' : list(shape),
+                            'validation_p' : validation_p,
+                            'categories' : d_categories,
+                            'entries' : d_entries})
+
+        self.load()
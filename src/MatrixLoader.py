@@ -11,15 +11,56 @@ MatrixLoader Module
 """
 
 from imageio import imread
+from io import BytesIO
+from ImageStore import ImageStore
+from ShardDataset import ShardReader, isShardDataset
+from Profiler import profiler
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import hashlib
+import json
 import os
+import time
+
+POOLS = {'process' : ProcessPoolExecutor, 'thread' : ThreadPoolExecutor}
+
+def decodeImages(files, workers=0, chunksize=16, pool='process'):
+    """
+    decode the given image paths with imread, sequentially or with a worker pool
+
+    The order of the returned list is always the order of the given files list.
+
+    :param files: list of image paths to decode
+    :param workers: number of workers of the pool, 0 to decode in the current process
+    :param chunksize: number of images sent to a worker at a time (process pool only)
+    :param pool: kind of pool to use, 'process' or 'thread'
+    :type files: list
+    :type workers: int
+    :type chunksize: int
+    :type pool: str
+
+    :return: the list of matrix of the given images
+    :rtype: list
+
+    :UC: pool in POOLS
+    """
+    assert(pool in POOLS)
+
+    if workers <= 0 or len(files) <= 1:
+        return [imread(img) for img in files]
+
+    with POOLS[pool](max_workers=workers) as executor:
+        return list(executor.map(imread, files, chunksize=chunksize))
 
 class MatrixLoader:
     """
     Create a clean MatrixLoader associated for a given path folder and categories list
+
+    The path can also be the folder of a packed shard dataset (see ShardDataset), the images
+    are then read from the shards instead of one file by image.
     """
     def __init__(self,path,categories):
         """
-        :param path: path of the folder where to find the training image by categories
+        :param path: path of the folder where to find the training image by categories, or of a packed shard dataset
         :type path: str
         :param categories: a list that contains the categories of the path folder
         :type categories: str
@@ -37,6 +78,65 @@ class MatrixLoader:
         self.validation_p = 0.75
         self.d_endindex = {cat : {'train' : 0, 'valid' : 0} for cat in categories}
         self.data = {}
+        self.workers = 0
+        self.chunksize = 16
+        self.pool = 'process'
+        self.store = None
+        self.shards = ShardReader(path) if isShardDataset(path) else None
+
+    def setImageStore(self,path):
+        """
+        :param path: path of the folder of the ImageStore to use, None to not use any store
+        :type path: str
+
+        :return: None
+        :side effect: the decoded images will be written in, and read back from, the ImageStore of the given folder,
+                      the store is not used with a packed shard dataset
+        """
+        self.store = None if path is None else ImageStore(path)
+
+    def getShardReader(self):
+        """
+        :return: the ShardReader of the packed shard dataset of self, None if the images are files
+        :rtype: ShardReader
+        """
+        return self.shards
+
+    def close(self):
+        """
+        :return: None
+        :side effect: unmap the shards opened by the reads of the images, if any
+        """
+        if self.shards is not None:
+            self.shards.close()
+
+    def getImageStore(self):
+        """
+        :return: the ImageStore used by self, None if the images are not stored
+        :rtype: ImageStore
+        """
+        return self.store
+
+    def setParallelDecoding(self,workers,chunksize=16,pool='process'):
+        """
+        :param workers: number of workers used to decode the images, 0 to decode them sequentially
+        :param chunksize: number of images sent to a worker at a time
+        :param pool: kind of pool to use, 'process' or 'thread'
+        :type workers: int
+        :type chunksize: int
+        :type pool: str
+
+        :return: None
+        :side effect: set the decoding parameters used by generateTrainAndValidMatrixImg
+
+        :UC: workers >= 0 & chunksize > 0 & pool in ['process','thread']
+        """
+        assert(workers >= 0 and chunksize > 0)
+        assert(pool in POOLS)
+
+        self.workers = workers
+        self.chunksize = chunksize
+        self.pool = pool
 
     def getDictionnaryImg(self):
         """
@@ -59,6 +159,32 @@ class MatrixLoader:
         """
         return self.d_endindex
 
+    def getFingerprint(self):
+        """
+        The images are identified by their length and crc32 in a packed shard dataset, by their
+        sha1 when an ImageStore is used, by their size and modification time otherwise, so the fingerprint changes when an image is added, removed,
+        changed or moved to another section.
+
+        :return: the fingerprint of the images listed and split by generateTrainAndValidMatrixImg
+        :rtype: str
+        """
+        d_entries = self.store.getManifest()['entries'] if self.store is not None and self.shards is None else {}
+        h = hashlib.sha1(json.dumps({'validation_p' : self.validation_p, 'categories' : self.categories}).encode())
+
+        for cat in self.categories:
+            train_end = self.d_endindex[cat]['train']
+            for i, path in enumerate(self.d_img[cat]):
+                if self.shards is not None:
+                    entry = self.shards.getEntryKey(self.shards.getIndex(os.path.relpath(path, self.path)))
+                elif path in d_entries:
+                    entry = d_entries[path]['sha1']
+                else:
+                    stat = os.stat(path)
+                    entry = "{}:{}".format(stat.st_size, stat.st_mtime_ns)
+                h.update("{}|{}|{}|{}\n".format(cat, 'train' if i < train_end else 'valid', os.path.basename(path), entry).encode())
+
+        return h.hexdigest()
+
     def addInDictionnaryImg(self,categorie,img_id):
         """
         :return: None
@@ -66,6 +192,7 @@ class MatrixLoader:
         """
         self.d_img[categorie].append(os.path.join(self.path+categorie,img_id))
 
+    @profiler.stage("listing")
     def fillDictionnaryImg(self):
         """
         :return: None
@@ -73,19 +200,119 @@ class MatrixLoader:
         """
         print("fillDictionnaryImg STARTING...",end='\n\n')
 
+        if self.path[-1] != "/":
+            self.path += "/"
+
+        if self.shards is not None:
+            # the names of the packed images are read from the index of the shards, in the order of the shards
+            shard_cat = self.shards.getCategories()
+            for name, code in zip(self.shards.getNames(), self.shards.getLabels()):
+                if shard_cat[code] in self.d_img:
+                    self.addInDictionnaryImg(shard_cat[code], name.split("/", 1)[1])
+
         for cat in self.categories:
-            if self.path[-1] != "/":
-                self.path += "/"
-            for img in os.listdir(self.path+cat):
-                self.addInDictionnaryImg(cat,img)
+            if self.shards is None:
+                for img in os.listdir(self.path+cat):
+                    self.addInDictionnaryImg(cat,img)
+            profiler.count("images_listed", len(self.d_img[cat]))
 
         print("fillDictionnaryImg DONE!",end='\n\n')
 
+    @profiler.stage("decoding")
+    def decode(self,files):
+        """
+        :param files: list of image paths
+        :type files: list
+
+        :return: the list of the decoded images of the given paths, in the same order
+        :rtype: list
+        :side effect: print the number of decoded images by second
+        """
+        start = time.perf_counter()
+        if self.shards is None:
+            l_matrix = decodeImages(files, self.workers, self.chunksize, self.pool)
+        elif self.shards.raw:
+            l_matrix = [self.shards.getImage(self.shards.getIndex(os.path.relpath(file, self.path))) for file in files]
+        else: # imread decodes the payloads read from the shards like files
+            l_matrix = decodeImages([self.shards.read(self.shards.getIndex(os.path.relpath(file, self.path))) for file in files], self.workers, self.chunksize, self.pool)
+        elapsed = time.perf_counter() - start
+        profiler.count("images_decoded", len(files))
+
+        print("DECODED {} IMAGES IN {:.2f}s -> {:.1f} img/s (workers = {}, pool = {})".format(len(files), elapsed, len(files) / max(elapsed, 1e-9), self.workers, self.pool),end='\n\n')
+
+        return l_matrix
+
+    def readPayload(self,file):
+        """
+        :param file: path of an image listed by fillDictionnaryImg
+        :type file: str
+
+        :return: the bytes of the image, read from its file or from the shards
+        :rtype: bytes
+        """
+        if self.shards is not None:
+            return self.shards.read(self.shards.getIndex(os.path.relpath(file, self.path)))
+
+        with open(file, 'rb') as f:
+            return f.read()
+
+    def decodePayload(self,payload):
+        """
+        :param payload: the bytes of an image given by readPayload
+        :type payload: bytes
+
+        :return: the matrix of the image
+        :rtype: ndarray
+        """
+        if self.shards is not None:
+            return self.shards.decodePayload(payload)
+
+        return imread(BytesIO(payload))
+
+    def splitFiles(self):
+        """
+        :return: the list of the images of all the categories, in the order of the categories
+        :rtype: list
+        :side effect: set the end index of the training images of each categorie in d_endindex
+        """
+        l_files = []
+        for cat in self.categories:
+            l_img = self.d_img[cat]
+
+            self.getDictionnaryEndIndex()[cat]['train'] = int(len(l_img) * self.validation_p)
+            self.getDictionnaryEndIndex()[cat]['valid'] =  len(l_img) - self.d_endindex[cat]['train']
+
+            l_files += l_img
+
+        return l_files
+
+    def generateTrainAndValidFiles(self):
+        """
+        list and split the images like generateTrainAndValidMatrixImg without decoding them, the
+        images are then read by the streaming pipeline of DataLoader.loadStreaming
+
+        :return: None
+        :side effect: fill the data dict by category with the training and validation files, the train_img
+                      and valid_img keys are None until the images are decoded
+        """
+        self.fillDictionnaryImg()
+        self.splitFiles()
+
+        for cat in self.categories:
+            train_end = self.getDictionnaryEndIndex()[cat]['train']
+            self.data[cat] = {'train_file': self.d_img[cat][:train_end],
+                              'valid_file': self.d_img[cat][train_end:],
+                              'train_img' : None,
+                              'valid_img' : None}
+
     def generateTrainAndValidMatrixImg(self):
         """
         create set of training and valid img
 
-        imread create a matrix of greyscale of given img
+        imread create a matrix of greyscale of given img, the images can be decoded
+        by a pool of workers (see setParallelDecoding). When an ImageStore is set, only the new
+        or changed images are decoded and all of them are memory-mapped from the store, the
+        split of the unchanged images is kept from the previous run (see setImageStore)
 
         :return: None
         :side effect: fill the data dict by category in order to eliminate a part of training img to use them in the validation phase of the model
@@ -95,22 +322,35 @@ class MatrixLoader:
         print("generateTrainAndValidMatrixImg STARTING...",end='\n\n')
         print("PORTION OF VALIDATION SET = {:.2f}%".format((1-self.validation_p)*100),end='\n\n')
 
+        if self.store is not None and self.shards is None:
+            # only the new or changed images are decoded, the other ones are read back from the store
+            d_img, d_endindex = self.store.rescan(self.d_img, self.validation_p, self.decode)
+            self.d_img.update(d_img)
+            self.d_endindex.update(d_endindex)
+        else:
+            # all the images are decoded in one call so that a worker pool is only started once
+            l_matrix = self.decode(self.splitFiles())
+
+        offset = 0
         for cat in self.categories:
             print("Enter in category : "+cat,end='\n\n')
 
             l_img = self.d_img[cat]
+            train_end = self.getDictionnaryEndIndex()[cat]['train']
 
-            self.getDictionnaryEndIndex()[cat]['train'] = int(len(l_img) * self.validation_p)
-            self.getDictionnaryEndIndex()[cat]['valid'] =  len(l_img) - self.d_endindex[cat]['train']
-
-            print("\ttraining_end index = " + str(self.d_endindex[cat]['train']),end='\n\n')
+            print("\ttraining_end index = " + str(train_end),end='\n\n')
             print("\tvalid_end index = " + str(len(l_img)),end='\n\n')
 
-            training_file = l_img[:self.getDictionnaryEndIndex()[cat]['train']]
-            valid_file = l_img[self.getDictionnaryEndIndex()[cat]['train']:]
+            training_file = l_img[:train_end]
+            valid_file = l_img[train_end:]
 
-            training_img = [imread(img) for img in training_file] # create a matrix for all training image path given in training_file list 
-            valid_img = [imread(img) for img in valid_file] #create a matrix for all validation image path given in valid_file list 
+            if self.store is not None and self.shards is None:
+                training_img = self.store.getCategoryImages(cat, 'train') # memory-mapped views, no copy
+                valid_img = self.store.getCategoryImages(cat, 'valid')
+            else:
+                training_img = l_matrix[offset:offset + train_end] # matrix for all training image path given in training_file list
+                valid_img = l_matrix[offset + train_end:offset + len(l_img)] # matrix for all validation image path given in valid_file list
+            offset += len(l_img)
 
             self.data[cat] = {'train_file': training_file,
                               'valid_file': valid_file,
@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`ModelStore` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+ModelStore Module
+
+"""
+
+import sklearn
+import hashlib
+import pickle
+import json
+import time
+import os
+
+def modelKey(fingerprint, config):
+    """
+    :param fingerprint: fingerprint of the dataset, see MatrixLoader.getFingerprint()
+    :param config: the hyperparameters and the feature configuration of the trained models
+    :type fingerprint: str
+    :type config: dict
+
+    :return: the key of the models trained with the given dataset and configuration
+    :rtype: str
+    """
+    return hashlib.sha1(json.dumps({'dataset' : fingerprint, 'config' : config}, sort_keys=True).encode()).hexdigest()[:20]
+
+class ModelStore:
+    """
+    Create a ModelStore which saves the (mlp, lda) couples of a HyperparameterTuning with their
+    metadata, in a folder by key of dataset and hyperparameters, and loads them back without training.
+    Models saved for another dataset, configuration or scikit-learn version are never loaded.
+    """
+    def __init__(self, path):
+        """
+        :param path: path of the folder of the store
+        :type path: str
+        :build: a ModelStore associated to the given folder
+
+        :UC: type(path) == str
+        """
+        assert(type(path) == str)
+
+        self.path = path
+
+    def getEntryPath(self, key):
+        """
+        :param key: key of the models
+        :type key: str
+
+        :return: the path of the folder of the models of the given key
+        :rtype: str
+        """
+        return os.path.join(self.path, key)
+
+    def save(self, key, fingerprint, config, l_mlp, l_meta):
+        """
+        :param key: key of the models, see modelKey()
+        :param fingerprint: fingerprint of the dataset
+        :param config: the hyperparameters and the feature configuration of the models
+        :param l_mlp: list of (mlp, lda) couples
+        :param l_meta: list of the metadata of each couple of l_mlp
+        :type key: str
+        :type fingerprint: str
+        :type config: dict
+        :type l_mlp: list
+        :type l_meta: list
+
+        :return: None
+        :side effect: write the pickled models then their json metadata in the folder of the given key
+
+        :UC: len(l_mlp) == len(l_meta)
+        """
+        assert(len(l_mlp) == len(l_meta))
+
+        entry = self.getEntryPath(key)
+        os.makedirs(entry, exist_ok=True)
+
+        tmp_models = os.path.join(entry, "models.pkl.tmp")
+        with open(tmp_models, 'wb') as f:
+            pickle.dump(l_mlp, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_models, os.path.join(entry, "models.pkl"))
+
+        # the metadata are written last, an entry without metadata is not complete
+        tmp_meta = os.path.join(entry, "meta.json.tmp")
+        with open(tmp_meta, 'w') as f:
+            json.dump({'key' : key,
+                       'dataset' : fingerprint,
+                       'config' : config,
+                       'sklearn' : sklearn.__version__,
+                       'created' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'models' : l_meta}, f, indent=2)
+        os.replace(tmp_meta, os.path.join(entry, "meta.json"))
+
+        print("ModelStore : {} models saved -> {}".format(len(l_mlp), entry),end='\n\n')
+
+    def loadMeta(self, key):
+        """
+        :param key: key of the models
+        :type key: str
+
+        :return: the metadata of the models of the given key, None if there is no complete entry for this key
+        :rtype: dict
+        """
+        try:
+            with open(os.path.join(self.getEntryPath(key), "meta.json"), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, key, fingerprint, config):
+        """
+        :param key: key of the models, see modelKey()
+        :param fingerprint: fingerprint of the current dataset
+        :param config: the current hyperparameters and feature configuration
+        :type key: str
+        :type fingerprint: str
+        :type config: dict
+
+        :return: (list of (mlp, lda) couples, metadata) or None if the store has no model up to date for the given key
+        :rtype: tuple
+        """
+        meta = self.loadMeta(key)
+
+        if meta is None:
+            return None
+
+        config = json.loads(json.dumps(config)) # same types as the saved metadata
+        if meta['dataset'] != fingerprint or meta['config'] != config or meta['sklearn'] != sklearn.__version__:
+            print("ModelStore : stale models ignored -> {}".format(self.getEntryPath(key)),end='\n\n')
+            return None
+
+        with open(os.path.join(self.getEntryPath(key), "models.pkl"), 'rb') as f:
+            l_mlp = pickle.load(f)
+
+        print("ModelStore : {} models loaded <- {}".format(len(l_mlp), self.getEntryPath(key)),end='\n\n')
+
+        return l_mlp, meta
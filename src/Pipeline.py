@@ -0,0 +1,252 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`Pipeline` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+Pipeline Module
+
+Streaming pipeline of stages connected by bounded queues:
+
+>>> pipeline = Pipeline(capacity=8)
+>>> pipeline.addStage("reader", read, workers=2)
+>>> pipeline.addStage("decoder", decode, workers=2)
+>>> stats = pipeline.run(items, sink)
+
+Each stage is run by its own threads, an item goes to the next stage as soon as it is done
+so the stages overlap. A full queue blocks the stage which feeds it (backpressure), so at most
+capacity items wait between two stages whatever the size of the input.
+
+"""
+
+import threading
+import queue
+import time
+
+END = object() # put in a queue once by worker of the stage which reads it, when there is no more item
+
+class Stage:
+    """
+    Create a Stage of a Pipeline, a function applied by workers threads on the items of its input queue
+    """
+    def __init__(self, name, function, workers, capacity):
+        """
+        :param name: name of the stage
+        :param function: function which gives the output item of an input item
+        :param workers: number of threads of the stage
+        :param capacity: max number of items in the input queue of the stage
+        :type name: str
+        :type function: function
+        :type workers: int
+        :type capacity: int
+        :build: a Stage with an empty input queue
+
+        :UC: workers > 0 & capacity > 0
+        """
+        assert(workers > 0 and capacity > 0)
+
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=capacity)
+        self.lock = threading.Lock()
+        self.running = workers
+        self.d_stats = {'items' : 0, 'busy_s' : 0.0, 'puts' : 0, 'depth_sum' : 0, 'depth_max' : 0, 'blocked_s' : 0.0}
+
+    def put(self, item):
+        """
+        :param item: an item for the stage
+        :type item: any
+
+        :return: None
+        :side effect: put the item in the input queue, wait while it is full, and sample its depth
+        """
+        with self.lock:
+            depth = self.queue.qsize()
+            self.d_stats['puts'] += 1
+            self.d_stats['depth_sum'] += depth
+            self.d_stats['depth_max'] = max(self.d_stats['depth_max'], depth)
+
+        start = time.perf_counter()
+        self.queue.put(item)
+        elapsed = time.perf_counter() - start
+
+        with self.lock:
+            self.d_stats['blocked_s'] += elapsed
+
+    def getStats(self):
+        """
+        :return: dictionnary with the number of items, the busy time of the workers, the mean and max depth
+                 of the input queue and the time the previous stage waited on the full queue
+        :rtype: dict
+        """
+        with self.lock:
+            return {'workers' : self.workers,
+                    'items' : self.d_stats['items'],
+                    'busy_s' : self.d_stats['busy_s'],
+                    'queue_mean' : self.d_stats['depth_sum'] / max(self.d_stats['puts'], 1),
+                    'queue_max' : self.d_stats['depth_max'],
+                    'queue_capacity' : self.queue.maxsize,
+                    'blocked_put_s' : self.d_stats['blocked_s']}
+
+class Pipeline:
+    """
+    Create a Pipeline of stages run by threads and connected by bounded queues, the last
+    stage gives its items to a sink called by the thread of run()
+    """
+    def __init__(self, capacity=8):
+        """
+        :param capacity: max number of items waiting in the input queue of each stage and of the sink
+        :type capacity: int
+        :build: a Pipeline without any stage
+
+        :UC: capacity > 0
+        """
+        assert(capacity > 0)
+
+        self.capacity = capacity
+        self.l_stages = []
+        self.errors = []
+
+    def addStage(self, name, function, workers=1):
+        """
+        :param name: name of the stage
+        :param function: function which gives the output item of an input item
+        :param workers: number of threads of the stage
+        :type name: str
+        :type function: function
+        :type workers: int
+
+        :return: None
+        :side effect: add a stage at the end of the pipeline
+        """
+        self.l_stages.append(Stage(name, function, workers, self.capacity))
+
+    def getStages(self):
+        """
+        :return: the list of the stages of the pipeline
+        :rtype: list
+        """
+        return self.l_stages
+
+    def work(self, k):
+        """
+        :param k: index of the stage
+        :type k: int
+
+        :return: None
+        :side effect: apply the function of the stage k on its items and put the results in the next queue
+                      until the end of the items. After an error the items are only consumed so that the
+                      other stages are never blocked
+        """
+        stage, out = self.l_stages[k], self.l_stages[k + 1]
+
+        while True:
+            item = stage.queue.get()
+            if item is END:
+                break
+            if len(self.errors) > 0:
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = stage.function(item)
+            except Exception as e:
+                self.errors.append((stage.name, e))
+                continue
+            elapsed = time.perf_counter() - start
+
+            with stage.lock:
+                stage.d_stats['items'] += 1
+                stage.d_stats['busy_s'] += elapsed
+            out.put(result)
+
+        with stage.lock:
+            stage.running -= 1
+            last = (stage.running == 0)
+        if last: # the next stage ends when all the workers of this one are done
+            for _ in range(out.workers):
+                out.put(END)
+
+    def feed(self, items):
+        """
+        :param items: iterable of the items of the pipeline
+        :type items: iterable
+
+        :return: None
+        :side effect: put the items in the queue of the first stage, then the end of the items
+        """
+        first = self.l_stages[0]
+        try:
+            for item in items:
+                if len(self.errors) > 0:
+                    break
+                first.put(item)
+        except Exception as e:
+            self.errors.append(("source", e))
+        finally:
+            for _ in range(first.workers):
+                first.put(END)
+
+    def run(self, items, sink):
+        """
+        :param items: iterable of the items of the pipeline, read by a thread as the first queue has room
+        :param sink: function called by the current thread on each item given by the last stage
+        :type items: iterable
+        :type sink: function
+
+        :return: dictionnary with the number of items given to the sink, the elapsed time, the throughput
+                 in items by second and the stats of each stage (see Stage.getStats)
+        :rtype: dict
+        :side effect: raise the first error of a stage or of the sink once all the threads are done
+
+        :UC: at least one stage has been added
+        """
+        assert(len(self.l_stages) > 0)
+
+        self.errors = []
+        sink_stage = Stage("sink", sink, 1, self.capacity)
+        self.l_stages.append(sink_stage)
+
+        l_threads = [threading.Thread(target=self.feed, args=(items,), daemon=True)]
+        for k, stage in enumerate(self.l_stages[:-1]):
+            l_threads += [threading.Thread(target=self.work, args=(k,), daemon=True) for _ in range(stage.workers)]
+
+        start = time.perf_counter()
+        for thread in l_threads:
+            thread.start()
+
+        n = 0
+        try:
+            while True:
+                item = sink_stage.queue.get()
+                if item is END:
+                    break
+                if len(self.errors) > 0:
+                    continue
+
+                item_start = time.perf_counter()
+                try:
+                    sink(item)
+                except Exception as e:
+                    self.errors.append(("sink", e))
+                    continue
+                sink_stage.d_stats['items'] += 1
+                sink_stage.d_stats['busy_s'] += time.perf_counter() - item_start
+                n += 1
+        finally:
+            for thread in l_threads:
+                thread.join()
+            self.l_stages.pop()
+        elapsed = time.perf_counter() - start
+
+        if len(self.errors) > 0:
+            name, error = self.errors[0]
+            raise RuntimeError("pipeline stage {} failed : {}".format(name, error)) from error
+
+        return {'items' : n,
+                'elapsed_s' : elapsed,
+                'items_per_s' : n / max(elapsed, 1e-9),
+                'stages' : {stage.name : stage.getStats() for stage in self.l_stages + [sink_stage]}}
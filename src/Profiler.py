@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`Profiler` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+Profiler Module
+
+The modules of the pipeline share the profiler instance of this module:
+
+>>> from Profiler import profiler
+>>> with profiler.stage("decoding"):
+...     profiler.count("images_decoded", 10)
+
+"""
+
+from contextlib import contextmanager
+from collections import OrderedDict
+import tracemalloc
+import cProfile
+import pstats
+import json
+import time
+import sys
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+def maxRssMB():
+    """
+    :return: the peak resident memory of the process in MB, None if it is not available
+    :rtype: float
+    """
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 2**20 if sys.platform == 'darwin' else maxrss / 2**10
+
+class Profiler:
+    """
+    Create a Profiler which times named stages of a run, counts named events and writes
+    a json report of them. A stage can be used as a context manager or as a decorator.
+
+    When the memory tracing is enabled the peak of the memory allocated during each stage
+    is also reported, and one stage can be profiled with cProfile.
+    """
+    def __init__(self):
+        """
+        :build: a Profiler without any stage nor counter
+        """
+        self.d_stages = OrderedDict()
+        self.d_counters = OrderedDict()
+        self.l_peaks = []
+        self.profiled_stage = None
+        self.profile = None
+        self.start = time.perf_counter()
+
+    def enableMemoryTracing(self):
+        """
+        :return: None
+        :side effect: start tracemalloc so the peak memory of each stage is reported
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def setProfiledStage(self, name):
+        """
+        :param name: name of the stage to profile with cProfile, None to profile nothing
+        :type name: str
+
+        :return: None
+        :side effect: every run of the given stage will be profiled
+        """
+        self.profiled_stage = name
+        self.profile = None if name is None else cProfile.Profile()
+
+    def getStages(self):
+        """
+        :return: dictionnary which contains the calls, total time and peak memory of each stage
+        :rtype: dict
+        """
+        return self.d_stages
+
+    def getCounters(self):
+        """
+        :return: dictionnary which contains the value of each counter
+        :rtype: dict
+        """
+        return self.d_counters
+
+    def count(self, name, n=1):
+        """
+        :param name: name of the counter
+        :param n: value to add to the counter
+        :type name: str
+        :type n: int
+
+        :return: None
+        :side effect: add n to the counter of the given name
+        """
+        self.d_counters[name] = self.d_counters.get(name, 0) + n
+
+    @contextmanager
+    def stage(self, name):
+        """
+        :param name: name of the stage
+        :type name: str
+
+        :return: a context manager (or decorator) which times the given stage
+        :side effect: add the time, and the peak memory if traced, of the stage in the stages dictionnary
+        """
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # the peak of an enclosing stage is kept before the reset for this stage
+            if len(self.l_peaks) > 0:
+                self.l_peaks[-1] = max(self.l_peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self.l_peaks.append(0)
+
+        profiled = (name == self.profiled_stage)
+        if profiled:
+            self.profile.enable()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+
+            if profiled:
+                self.profile.disable()
+
+            d_stage = self.d_stages.setdefault(name, {'calls' : 0, 'total_s' : 0.0, 'peak_traced_mb' : None, 'maxrss_mb' : None})
+            d_stage['calls'] += 1
+            d_stage['total_s'] += elapsed
+            d_stage['maxrss_mb'] = maxRssMB()
+
+            if tracing and tracemalloc.is_tracing():
+                peak = max(self.l_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if len(self.l_peaks) > 0:
+                    self.l_peaks[-1] = max(self.l_peaks[-1], peak)
+                tracemalloc.reset_peak()
+                d_stage['peak_traced_mb'] = max(d_stage['peak_traced_mb'] or 0, peak / 2**20)
+
+    def writeReport(self, path, profile_path=None):
+        """
+        :param path: path of the json report
+        :param profile_path: path of the cProfile stats of the profiled stage, None to not write them
+        :type path: str
+        :type profile_path: str
+
+        :return: None
+        :side effect: write the json report of the stages and counters, and print the 20 most costly functions of the profiled stage
+        """
+        report = {'wall_s' : time.perf_counter() - self.start,
+                  'maxrss_mb' : maxRssMB(),
+                  'stages' : self.d_stages,
+                  'counters' : self.d_counters,
+                  'profiled_stage' : self.profiled_stage}
+
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        print("Profiler : report written in " + path,end='\n\n')
+
+        if self.profile is not None:
+            if profile_path is not None:
+                self.profile.dump_stats(profile_path)
+            try:
+                pstats.Stats(self.profile).sort_stats('cumulative').print_stats(20)
+            except TypeError: # the profiled stage has not been run
+                pass
+
+profiler = Profiler()
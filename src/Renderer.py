@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`Renderer` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+Renderer Module
+
+"""
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from imageio import imwrite
+from math import ceil
+import numpy as np
+import json
+
+POOLS = {'process' : ProcessPoolExecutor, 'thread' : ThreadPoolExecutor}
+
+def renderFigure(job):
+    """
+    render one image with its title in a png file, with a Figure drawn on its own Agg canvas
+    so no pyplot global state is used and the function can run in a worker
+
+    :param job: tuple (path of the png file, matrix image, title)
+    :type job: tuple
+
+    :return: the path of the written png file
+    :rtype: str
+    """
+    path, img, title = job
+
+    fig = Figure(figsize=(4,4))
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0.05, 0.02, 0.9, 0.76]) # fixed room for a title of three lines, no tight_layout
+    ax.imshow(img)
+    ax.set_title(title)
+    ax.axis('off')
+    fig.savefig(path)
+
+    return path
+
+def tileImages(l_img, columns=8, padding=2):
+    """
+    :param l_img: list of greyscale matrix images
+    :param columns: number of images by line of the montage
+    :param padding: number of black pixels between two images
+    :type l_img: list
+    :type columns: int
+    :type padding: int
+
+    :return: the montage of the given images, line by line, in one uint8 matrix; the images are
+             put at the top left of tiles of the size of the biggest one
+    :rtype: ndarray
+
+    :UC: len(l_img) > 0 & columns > 0 & padding >= 0
+    """
+    assert(len(l_img) > 0 and columns > 0 and padding >= 0)
+
+    height = max(img.shape[0] for img in l_img)
+    width = max(img.shape[1] for img in l_img)
+    columns = min(columns, len(l_img))
+    lines = ceil(len(l_img) / columns)
+
+    montage = np.zeros((lines * (height + padding) + padding, columns * (width + padding) + padding), dtype=np.uint8)
+
+    for k, img in enumerate(l_img):
+        top = padding + (k // columns) * (height + padding)
+        left = padding + (k % columns) * (width + padding)
+        montage[top:top + img.shape[0], left:left + img.shape[1]] = np.asarray(img, dtype=np.uint8)
+
+    return montage
+
+class Renderer:
+    """
+    Create a Renderer which writes the images of a test session, either as one png figure by
+    image rendered by a pool of workers, or as one montage of all the images with a json
+    file of their titles.
+    """
+    def __init__(self, workers=0, pool='process'):
+        """
+        :param workers: number of workers which render the figures, 0 to render them in the current process
+        :param pool: kind of pool to use, 'process' or 'thread'
+        :type workers: int
+        :type pool: str
+        :build: a Renderer with the given workers
+
+        :UC: workers >= 0 & pool in ['process','thread']
+        """
+        assert(workers >= 0)
+        assert(pool in POOLS)
+
+        self.workers = workers
+        self.pool = pool
+
+    def render(self, l_jobs):
+        """
+        :param l_jobs: list of tuples (path of the png file, matrix image, title)
+        :type l_jobs: list
+
+        :return: the list of the written png files
+        :rtype: list
+        :side effect: write a png figure for each job
+        """
+        if self.workers <= 0 or len(l_jobs) <= 1:
+            return [renderFigure(job) for job in l_jobs]
+
+        with POOLS[self.pool](max_workers=self.workers) as executor:
+            return list(executor.map(renderFigure, l_jobs))
+
+    def montage(self, l_jobs, path, columns=8):
+        """
+        :param l_jobs: list of tuples (name of the image, matrix image, title)
+        :param path: path of the png file of the montage, the titles are written in the same path with a .json extension
+        :param columns: number of images by line of the montage
+        :type l_jobs: list
+        :type path: str
+        :type columns: int
+
+        :return: the list of the written files
+        :rtype: list
+        :side effect: write the montage of the images of the jobs and the json list of their names, titles and tiles
+        """
+        if len(l_jobs) == 0:
+            return []
+
+        columns = min(columns, len(l_jobs))
+        imwrite(path, tileImages([img for name, img, title in l_jobs], columns))
+
+        labels = path.rsplit('.', 1)[0] + '.json'
+        with open(labels, 'w') as f:
+            json.dump([{'name' : name, 'title' : title, 'line' : k // columns, 'column' : k % columns}
+                       for k, (name, img, title) in enumerate(l_jobs)], f, indent=2)
+
+        return [path, labels]
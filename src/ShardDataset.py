@@ -0,0 +1,380 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`ShardDataset` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+ShardDataset Module
+
+Pack the images of a data/train folder in a few large shard files:
+
+$ python3 src/ShardDataset.py data/train data/descriptions/categories.txt data/shards
+
+A shard file holds the header MAGIC, the image payloads one after the other (the encoded file
+bytes, or the raw pixels with --raw), a json index of the name, categorie code, offset and crc32
+of each payload, then a footer with the offset and length of the index. The folder also holds
+a manifest.json with the categories and the list of the shards.
+
+The folder of the shards can be given to MatrixLoader in place of the data/train folder.
+
+"""
+
+from imageio import imread
+from io import BytesIO
+import numpy as np
+import argparse
+import struct
+import json
+import mmap
+import zlib
+import time
+import os
+
+MAGIC = b'MLPSHRD1'
+FOOTER = struct.Struct('<QQ8s')
+FORMAT = 'shards'
+
+def isShardDataset(path):
+    """
+    :param path: path of a folder
+    :type path: str
+
+    :return: True if the given folder holds a packed shard dataset, the manifest.json of an ImageStore is not one
+    :rtype: bool
+    """
+    try:
+        with open(os.path.join(path, "manifest.json"), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    return isinstance(manifest, dict) and manifest.get('format') == FORMAT
+
+class ShardWriter:
+    """
+    Create a ShardWriter which appends payloads to shard files of a folder, a new shard is
+    started when the current one is bigger than shard_bytes
+    """
+    def __init__(self, path, categories, raw=False, shard_bytes=64 * 2**20):
+        """
+        :param path: folder of the shards
+        :param categories: list of the categories
+        :param raw: True if the payloads are raw pixels, False if they are encoded image files
+        :param shard_bytes: size of the payloads of a shard after which a new shard is started
+        :type path: str
+        :type categories: list
+        :type raw: bool
+        :type shard_bytes: int
+        :build: a ShardWriter without any shard
+
+        :UC: shard_bytes > 0
+        """
+        assert(shard_bytes > 0)
+
+        self.path = path
+        self.categories = list(categories)
+        self.raw = raw
+        self.shard_bytes = shard_bytes
+        self.shape = None
+        self.dtype = None
+        self.l_shards = []
+        self.f = None
+
+        os.makedirs(path, exist_ok=True)
+
+    def startShard(self):
+        """
+        :return: None
+        :side effect: open a new shard file and write its header
+        """
+        name = "shard_{:05d}.bin".format(len(self.l_shards))
+        self.f = open(os.path.join(self.path, name), 'wb')
+        self.f.write(MAGIC)
+        self.index = {'names' : [], 'labels' : [], 'offsets' : [], 'lengths' : [], 'crc' : []}
+        self.l_shards.append({'file' : name, 'count' : 0})
+
+    def closeShard(self):
+        """
+        :return: None
+        :side effect: write the index and the footer of the current shard and close it
+        """
+        index_offset = self.f.tell()
+        index = json.dumps(self.index).encode()
+        self.f.write(index)
+        self.f.write(FOOTER.pack(index_offset, len(index), MAGIC))
+        self.f.close()
+        self.l_shards[-1]['count'] = len(self.index['names'])
+        self.f = None
+
+    def append(self, name, cat, payload):
+        """
+        :param name: name of the image, relative to the packed folder
+        :param cat: categorie of the image
+        :param payload: encoded bytes of the image, or matrix of the image if raw
+        :type name: str
+        :type cat: str
+        :type payload: bytes or ndarray
+
+        :return: None
+        :side effect: write the payload at the end of the current shard
+
+        :UC: if raw, all the images have the same shape and type
+        """
+        if self.raw:
+            payload = np.ascontiguousarray(payload)
+            if self.shape is None:
+                self.shape, self.dtype = list(payload.shape), payload.dtype.str
+            assert(list(payload.shape) == self.shape and payload.dtype.str == self.dtype)
+            payload = payload.tobytes()
+
+        if self.f is None or self.f.tell() > self.shard_bytes:
+            if self.f is not None:
+                self.closeShard()
+            self.startShard()
+
+        self.index['names'].append(name)
+        self.index['labels'].append(self.categories.index(cat))
+        self.index['offsets'].append(self.f.tell())
+        self.index['lengths'].append(len(payload))
+        self.index['crc'].append(zlib.crc32(payload))
+        self.f.write(payload)
+
+    def close(self):
+        """
+        :return: None
+        :side effect: close the current shard and write the manifest of the folder
+        """
+        if self.f is not None:
+            self.closeShard()
+
+        with open(os.path.join(self.path, "manifest.json"), 'w') as f:
+            json.dump({'format' : FORMAT,
+                       'version' : 1,
+                       'raw' : self.raw,
+                       'shape' : self.shape,
+                       'dtype' : self.dtype,
+                       'categories' : self.categories,
+                       'count' : sum(shard['count'] for shard in self.l_shards),
+                       'shards' : self.l_shards}, f, indent=2)
+
+def packDataset(path, categories, out, raw=False, shard_bytes=64 * 2**20):
+    """
+    :param path: folder of the images by categorie, like data/train
+    :param categories: list of the categories
+    :param out: folder of the shards
+    :param raw: if True the decoded pixels are packed instead of the encoded files
+    :param shard_bytes: size of the payloads of a shard after which a new shard is started
+    :type path: str
+    :type categories: list
+    :type out: str
+    :type raw: bool
+    :type shard_bytes: int
+
+    :return: the number of packed images
+    :rtype: int
+    :side effect: write the shards and the manifest of the images of the given folder, in sorted order by categorie
+    """
+    start = time.perf_counter()
+    writer = ShardWriter(out, categories, raw, shard_bytes)
+    n = 0
+
+    for cat in categories:
+        for name in sorted(os.listdir(os.path.join(path, cat))):
+            file = os.path.join(path, cat, name)
+            if raw:
+                payload = imread(file)
+            else:
+                with open(file, 'rb') as f:
+                    payload = f.read()
+            writer.append(cat + "/" + name, cat, payload)
+            n += 1
+
+    writer.close()
+
+    print("PACKED {} IMAGES IN {} SHARDS IN {:.2f}s -> {}".format(n, len(writer.l_shards), time.perf_counter() - start, out),end='\n\n')
+
+    return n
+
+class ShardReader:
+    """
+    Create a ShardReader of a folder of shards, which gives the images by their index in the
+    dataset (random access through memory-mapped shards) or in the order of the shards
+    (sequential streaming with plain reads).
+    """
+    def __init__(self, path):
+        """
+        :param path: folder of the shards
+        :type path: str
+        :build: a ShardReader which has read the manifest and the index of every shard
+
+        :UC: isShardDataset(path)
+        """
+        assert(isShardDataset(path))
+
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), 'r') as f:
+            self.manifest = json.load(f)
+
+        self.categories = self.manifest['categories']
+        self.raw = self.manifest['raw']
+        self.l_maps = [None] * len(self.manifest['shards'])
+
+        l_names, l_labels, l_shard, l_offsets, l_lengths, l_crc = [], [], [], [], [], []
+        for k, shard in enumerate(self.manifest['shards']):
+            index = self.readIndex(shard['file'])
+            l_names += index['names']
+            l_labels += index['labels']
+            l_shard += [k] * len(index['names'])
+            l_offsets += index['offsets']
+            l_lengths += index['lengths']
+            l_crc += index['crc']
+
+        self.names = l_names
+        self.labels = np.array(l_labels, dtype=np.int32)
+        self.shard = np.array(l_shard, dtype=np.int32)
+        self.offsets = np.array(l_offsets, dtype=np.int64)
+        self.lengths = np.array(l_lengths, dtype=np.int64)
+        self.crc = np.array(l_crc, dtype=np.int64)
+        self.d_index = {name : i for i, name in enumerate(self.names)}
+
+    def readIndex(self, file):
+        """
+        :param file: name of a shard file
+        :type file: str
+
+        :return: the index of the given shard
+        :rtype: dict
+        """
+        with open(os.path.join(self.path, file), 'rb') as f:
+            f.seek(-FOOTER.size, os.SEEK_END)
+            index_offset, index_length, magic = FOOTER.unpack(f.read(FOOTER.size))
+            assert(magic == MAGIC)
+            f.seek(index_offset)
+            return json.loads(f.read(index_length))
+
+    def __len__(self):
+        """
+        :return: the number of images of the dataset
+        :rtype: int
+        """
+        return len(self.names)
+
+    def getCategories(self):
+        """
+        :return: the list of the categories of the dataset
+        :rtype: list
+        """
+        return self.categories
+
+    def getNames(self):
+        """
+        :return: the name of each image, relative to the packed folder
+        :rtype: list
+        """
+        return self.names
+
+    def getLabels(self):
+        """
+        :return: the categorie code of each image
+        :rtype: ndarray
+        """
+        return self.labels
+
+    def getIndex(self, name):
+        """
+        :param name: name of an image, relative to the packed folder
+        :type name: str
+
+        :return: the index of the image of the given name
+        :rtype: int
+        """
+        return self.d_index[name]
+
+    def getEntryKey(self, i):
+        """
+        :param i: index of an image
+        :type i: int
+
+        :return: a key of the content of the image, its length and crc32
+        :rtype: str
+        """
+        return "{}:{}".format(self.lengths[i], self.crc[i])
+
+    def read(self, i):
+        """
+        :param i: index of an image
+        :type i: int
+
+        :return: the payload of the image, read from the memory-mapped shard
+        :rtype: bytes
+        """
+        k = self.shard[i]
+        if self.l_maps[k] is None:
+            with open(os.path.join(self.path, self.manifest['shards'][k]['file']), 'rb') as f:
+                self.l_maps[k] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self.l_maps[k][self.offsets[i]:self.offsets[i] + self.lengths[i]]
+
+    def decodePayload(self, payload):
+        """
+        :param payload: the payload of an image
+        :type payload: bytes
+
+        :return: the matrix of the image
+        :rtype: ndarray
+        """
+        if self.raw:
+            return np.frombuffer(payload, dtype=np.dtype(self.manifest['dtype'])).reshape(self.manifest['shape'])
+        return imread(BytesIO(payload))
+
+    def getImage(self, i):
+        """
+        :param i: index of an image
+        :type i: int
+
+        :return: the matrix of the image of the given index
+        :rtype: ndarray
+        """
+        return self.decodePayload(self.read(i))
+
+    def iterRecords(self):
+        """
+        Generator of the images in the order of the shards, each shard is read sequentially
+
+        :return: generator of tuples (name, categorie code, payload)
+        :rtype: generator
+        """
+        i = 0
+        for shard in self.manifest['shards']:
+            with open(os.path.join(self.path, shard['file']), 'rb') as f:
+                f.seek(len(MAGIC))
+                for _ in range(shard['count']):
+                    payload = f.read(self.lengths[i])
+                    yield self.names[i], int(self.labels[i]), payload
+                    i += 1
+
+    def close(self):
+        """
+        :return: None
+        :side effect: unmap the opened shards, they are mapped again by the next read()
+        """
+        for k, m in enumerate(self.l_maps):
+            if m is not None:
+                m.close()
+                self.l_maps[k] = None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack the images of a folder by categorie in shard files")
+    parser.add_argument("path", help="folder of the images by categorie, like data/train")
+    parser.add_argument("categories", help="file of the categories, like data/descriptions/categories.txt")
+    parser.add_argument("out", help="folder of the shards")
+    parser.add_argument("--raw", action="store_true", help="pack the decoded pixels instead of the encoded files")
+    parser.add_argument("--shard-size", type=int, default=64, help="size in MB after which a new shard is started")
+    args = parser.parse_args()
+
+    with open(args.categories, 'r') as f:
+        l_cat = [line.strip() for line in f if line.strip() != ""]
+
+    packDataset(args.path, l_cat, args.out, args.raw, args.shard_size * 2**20)
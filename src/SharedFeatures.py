@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`SharedFeatures` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+SharedFeatures Module
+
+"""
+
+from multiprocessing import shared_memory
+import numpy as np
+
+SECTIONS = ["train", "valid"]
+
+class SharedFeatures:
+    """
+    Create a SharedFeatures which copies once the features and the label codes of each section
+    of a DataLoader in shared memory blocks, so the worker processes of a pool can read them
+    as numpy arrays without receiving a copy.
+
+    The owner gives getSpec() to the workers, which call attach(spec), and calls close() when
+    the workers are done.
+    """
+    def __init__(self, dataloader):
+        """
+        :param dataloader: the loaded DataLoader whose features are shared
+        :type dataloader: DataLoader
+        :build: a SharedFeatures which owns a shared memory block for each array of each section
+        """
+        self.l_blocks = []
+        self.spec = {'categories' : list(dataloader.getCategories())}
+
+        for section in SECTIONS:
+            self.spec[section] = {'features' : self.share(dataloader.getDictionnaryFeatures()[section]),
+                                  'labels' : self.share(dataloader.getDictionnaryLabels()[section])}
+
+    def share(self, array):
+        """
+        :param array: the array to share
+        :type array: ndarray
+
+        :return: (name of the shared memory block, shape, dtype) of the copy of the given array
+        :rtype: tuple
+        :side effect: create a shared memory block which contains a copy of the given array
+        """
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        self.l_blocks.append(block)
+
+        return block.name, array.shape, array.dtype.str
+
+    def getSpec(self):
+        """
+        :return: the picklable description of the shared arrays to give to attach()
+        :rtype: dict
+        """
+        return self.spec
+
+    def close(self):
+        """
+        :return: None
+        :side effect: release the shared memory blocks of self
+        """
+        for block in self.l_blocks:
+            block.close()
+            block.unlink()
+        self.l_blocks = []
+
+def attach(spec):
+    """
+    :param spec: the description of the shared arrays given by SharedFeatures.getSpec()
+    :type spec: dict
+
+    :return: dictionnary which contains the categories and, for each section, the read-only features and labels arrays
+             backed by the shared memory blocks, and the list of the attached blocks which must stay referenced
+    :rtype: dict
+    """
+    data = {'categories' : spec['categories'], 'blocks' : []}
+
+    for section in SECTIONS:
+        data[section] = {}
+        for key, (name, shape, dtype) in spec[section].items():
+            block = shared_memory.SharedMemory(name=name)
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            array.flags.writeable = False
+            data[section][key] = array
+            data['blocks'].append(block)
+
+    return data
+
+def getSubsetRows(data, categories, section):
+    """
+    :param data: the attached arrays given by attach()
+    :param categories: list of categories
+    :param section: the section
+    :type data: dict
+    :type categories: list
+    :type section: str
+
+    :return: the sorted rows of the given categories in the arrays of the section, like DataLoader.getSubsetRows
+    :rtype: ndarray
+    """
+    codes = [code for code, cat in enumerate(data['categories']) if cat in set(categories)]
+
+    return np.flatnonzero(np.isin(data[section]['labels'], codes))
+
+def getSubset(data, categories, section):
+    """
+    :param data: the attached arrays given by attach()
+    :param categories: list of categories
+    :param section: the section
+    :type data: dict
+    :type categories: list
+    :type section: str
+
+    :return: the features of the given categories and the categorie name of each row, in the order of DataLoader.getSubset
+    :rtype: (ndarray, ndarray)
+    """
+    rows = getSubsetRows(data, categories, section)
+
+    return data[section]['features'][rows], np.array(data['categories'])[data[section]['labels'][rows]]
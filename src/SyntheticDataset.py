@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`SyntheticDataset` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+SyntheticDataset Module
+
+Write a dataset of synthetic greyscale faces in the layout of the data folder, to benchmark
+the pipeline at any size:
+
+>>> generateDataset("/tmp/synth", 10000, 7)
+
+gives /tmp/synth/train/<category>/*.jpg and /tmp/synth/descriptions/categories.txt
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from imageio import imwrite
+import numpy as np
+import time
+import os
+
+def synthesizeFace(rng, code, n_categories, size=48):
+    """
+    draw a face whose mouth, eyebrows and eyes depend on the categorie code, with a random
+    position, lighting and noise so the categories overlap like the FER-2013 ones
+
+    :param rng: the random generator
+    :param code: the code of the categorie of the face
+    :param n_categories: the number of categories
+    :param size: the width and height of the image
+    :type rng: numpy.random.Generator
+    :type code: int
+    :type n_categories: int
+    :type size: int
+
+    :return: the greyscale image of the face
+    :rtype: ndarray of shape (size, size) and type uint8
+    """
+    y, x = np.mgrid[0:size, 0:size] / size
+    cx, cy = 0.5 + rng.normal(0, 0.04), 0.5 + rng.normal(0, 0.04)
+    expression = 2 * code / max(n_categories - 1, 1) - 1 # in [-1, 1]
+
+    img = 60 + 40 * rng.random() + 30 * (x - 0.5) * rng.normal()
+    face = ((x - cx) / 0.32)**2 + ((y - cy) / 0.42)**2 < 1
+    img = np.where(face, img + 80 + 30 * rng.random(), img)
+
+    for side in [-1, 1]:
+        eye = ((x - cx - side * 0.13) / 0.05)**2 + ((y - cy + 0.1) / (0.025 + 0.015 * (1 + expression)))**2 < 1
+        brow = (np.abs(y - (cy - 0.2 - side * 0.04 * expression * (x - cx - side * 0.13) / 0.1)) < 0.015) & (np.abs(x - cx - side * 0.13) < 0.08)
+        img = np.where(eye | brow, 40, img)
+
+    mouth_y = cy + 0.2 + 0.12 * expression * ((x - cx) / 0.15)**2 - 0.06 * expression
+    mouth = (np.abs(y - mouth_y) < 0.015 + 0.02 * max(0, -expression)) & (np.abs(x - cx) < 0.15)
+    img = np.where(mouth, 50, img)
+
+    img = img + rng.normal(0, 12 + 6 * rng.random(), (size, size))
+
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+def writeImages(job):
+    """
+    :param job: tuple (folder, categorie code, number of categories, index of the first image, number of images, seed, size, jpeg quality)
+    :type job: tuple
+
+    :return: the number of written images
+    :rtype: int
+    :side effect: write the images of the job in the folder, the image i is named synth_<i>.jpg
+    """
+    folder, code, n_categories, first, count, seed, size, quality = job
+    rng = np.random.default_rng([seed, code, first])
+
+    for i in range(first, first + count):
+        imwrite(os.path.join(folder, "synth_{:07d}.jpg".format(i)), synthesizeFace(rng, code, n_categories, size), quality=quality)
+
+    return count
+
+def generateDataset(path, n_images, categories=7, seed=0, size=48, quality=90, workers=0, chunk=1000):
+    """
+    write n_images synthetic faces spread evenly on the categories in path/train/<category>/ and the
+    list of the categories in path/descriptions/categories.txt. The same arguments give the same images.
+
+    :param path: root folder of the dataset
+    :param n_images: total number of images
+    :param categories: list of categorie names, or number of categories named cat_0, cat_1, ...
+    :param seed: seed of the images
+    :param size: the width and height of the images
+    :param quality: jpeg quality of the images
+    :param workers: number of processes which write the images, 0 to write them in the current process
+    :param chunk: number of images written by a job
+    :type path: str
+    :type n_images: int
+    :type categories: list or int
+    :type seed: int
+    :type size: int
+    :type quality: int
+    :type workers: int
+    :type chunk: int
+
+    :return: dictionnary with the number of images by categorie, the time and the throughput of the generation
+    :rtype: dict
+
+    :UC: n_images > 0 & chunk > 0
+    """
+    assert(n_images > 0 and chunk > 0)
+
+    if type(categories) == int:
+        categories = ["cat_{}".format(code) for code in range(categories)]
+
+    os.makedirs(os.path.join(path, "descriptions"), exist_ok=True)
+    with open(os.path.join(path, "descriptions", "categories.txt"), 'w') as f:
+        f.write("\n".join(categories))
+
+    l_jobs, d_count = [], {}
+    for code, cat in enumerate(categories):
+        folder = os.path.join(path, "train", cat)
+        os.makedirs(folder, exist_ok=True)
+
+        d_count[cat] = n_images // len(categories) + (code < n_images % len(categories))
+        l_jobs += [(folder, code, len(categories), first, min(chunk, d_count[cat] - first), seed, size, quality)
+                   for first in range(0, d_count[cat], chunk)]
+
+    start = time.perf_counter()
+    if workers <= 0:
+        n = sum(writeImages(job) for job in l_jobs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            n = sum(executor.map(writeImages, l_jobs))
+    elapsed = time.perf_counter() - start
+
+    print("GENERATED {} IMAGES IN {} CATEGORIES IN {:.2f}s -> {:.1f} img/s -> {}".format(n, len(categories), elapsed, n / max(elapsed, 1e-9), path),end='\n\n')
+
+    return {'images' : d_count, 'generate_s' : elapsed, 'images_per_s' : n / max(elapsed, 1e-9)}
@@ -10,14 +10,174 @@ TrainingModel Module
 """
 
 from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+from Profiler import profiler
+from Evaluation import Evaluation, evaluate
+from collections import OrderedDict
+import numpy as np
+
+projection_cache = OrderedDict()
+projection_cache_size = 16
+
+def clearProjectionCache():
+  """
+  :return: none
+  :side effect: remove all the LDA projections kept by project()
+  """
+  projection_cache.clear()
+
+def fitProjection(train_features, train_cat, valid_features):
+  """
+  :param train_features: the features of the train section
+  :param train_cat: the categorie of each row of train_features
+  :param valid_features: the features of the valid section
+  :type train_features: ndarray
+  :type train_cat: ndarray
+  :type valid_features: ndarray
+
+  :return: (a LinearDiscriminantAnalysis fitted with the train section, the transformed train features, the transformed valid features)
+  :rtype: tuple
+  """
+  with profiler.stage("lda_fit"):
+    lda = LinearDiscriminantAnalysis(n_components=1).fit(train_features, train_cat)
+
+    return lda, lda.transform(train_features), lda.transform(valid_features)
+
+def fitAndEvaluate(mlp, train_features, train_cat, valid_features, valid_cat, train_rows=None, valid_rows=None):
+  """
+  :param mlp: a classifier multilayer perceptron to use
+  :param train_features: the transformed features of the train section
+  :param train_cat: the categorie of each row of train_features
+  :param valid_features: the transformed features of the valid section
+  :param valid_cat: the categorie of each row of valid_features
+  :param train_rows: the row of each row of train_features in the DataLoader train section
+  :param valid_rows: the row of each row of valid_features in the DataLoader valid section
+  :type mlp: MLPClassifier
+  :type train_features: ndarray
+  :type train_cat: ndarray
+  :type valid_features: ndarray
+  :type valid_cat: ndarray
+  :type train_rows: ndarray
+  :type valid_rows: ndarray
+
+  :return: (the train Evaluation, the validation Evaluation) of the mlp fitted with the train section
+  :rtype: tuple
+  """
+  with profiler.stage("mlp_fit"):
+    mlp.fit(train_features, train_cat)
+
+  with profiler.stage("scoring"):
+    train_evaluation = evaluate(mlp, train_features, train_cat, train_rows)
+
+    valid_evaluation = evaluate(mlp, valid_features, valid_cat, valid_rows)
+
+  return train_evaluation, valid_evaluation
+
+def fitAndEvaluateStreaming(mlp, train_features, train_cat, valid_features, valid_cat, epochs=10, batch_size=256, lda_sample=10000, seed=1):
+  """
+  Version of trainStreaming on features arrays: the LDA is fited with the first lda_sample rows of a shuffled
+  pass on the train features, then the mlp is fited with partial_fit on shuffled mini-batches of the transformed
+  features for the given number of epochs, with the same shuffles as trainStreaming.
+
+  :param mlp: a classifier multilayer perceptron to use, its solver must support partial_fit and early_stopping must be False
+  :param train_features: the features of the train rows
+  :param train_cat: the categorie of each train row
+  :param valid_features: the features of the valid rows
+  :param valid_cat: the categorie of each valid row
+  :param epochs: number of passes on the train rows
+  :param batch_size: number of rows of each mini-batch
+  :param lda_sample: max number of rows used to fit the LDA
+  :param seed: seed of the shuffle of the mini-batches
+  :type mlp: MLPClassifier
+  :type train_features: ndarray
+  :type train_cat: ndarray
+  :type valid_features: ndarray
+  :type valid_cat: ndarray
+  :type epochs: int
+  :type batch_size: int
+  :type lda_sample: int
+  :type seed: int
+
+  :return: (the train Evaluation, the validation Evaluation, the used LinearDiscriminantAnalysis object during training)
+  :rtype: tuple
+  """
+  classes = np.unique(train_cat)
+  sample = np.random.default_rng(seed).permutation(len(train_cat))[:lda_sample]
+
+  with profiler.stage("lda_fit"):
+    lda = LinearDiscriminantAnalysis(n_components=1).fit(train_features[sample], train_cat[sample])
+
+  mlp.set_params(warm_start=False)
+  train_features, valid_features = lda.transform(train_features), lda.transform(valid_features)
+
+  with profiler.stage("mlp_fit"):
+    for epoch in range(epochs):
+      order = np.random.default_rng(seed + epoch).permutation(len(train_cat))
+      for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        mlp.partial_fit(train_features[batch], train_cat[batch], classes=classes)
+
+  with profiler.stage("scoring"):
+    train_evaluation = evaluate(mlp, train_features, train_cat)
+    valid_evaluation = evaluate(mlp, valid_features, valid_cat)
+
+  return train_evaluation, valid_evaluation, lda
+
+def project(dataloader, categories):
+  """
+  Fit a LinearDiscriminantAnalysis (LDA) with the train section of the given categories and transform
+  the train and valid features with it.
+
+  The last projection_cache_size projections are kept by (category subset, feature config, DataLoader version),
+  so a projection asked again is returned without fitting. The projections of a DataLoader are dropped
+  when it has been loaded again, clearProjectionCache() drops all of them.
+
+  :param dataloader: the DataLoader used during the preprocessing dataset loading
+  :param categories: the list of data categories
+  :type dataloader: DataLoader
+  :type categories: List
+
+  :return: (the fitted LDA, transformed train features, train categories, transformed valid features, valid categories)
+  :rtype: tuple
+  """
+  dl = dataloader
+  config = tuple(sorted(dl.getFeatureLoader().getConfig().items()))
+  key = (id(dl), dl.getVersion(), frozenset(categories), config)
+
+  if key in projection_cache:
+    profiler.count("lda_cache_hits")
+    projection_cache.move_to_end(key)
+    return projection_cache[key][1:]
+
+  # the projections of an older version of this DataLoader will never be asked again
+  for old in [old for old in projection_cache if old[0] == id(dl) and old[1] != dl.getVersion()]:
+    del projection_cache[old]
+
+  profiler.count("lda_cache_misses")
+
+  train_features, train_cat = dl.convergeFeatures(categories, 'train')
+  valid_features, valid_cat = dl.convergeFeatures(categories, 'valid')
+
+  lda, train_features, valid_features = fitProjection(train_features, train_cat, valid_features)
+
+  train_features.flags.writeable = False
+  valid_features.flags.writeable = False
+
+  # the DataLoader is kept in the entry so its id can not be given to another one while cached
+  projection_cache[key] = (dl, lda, train_features, train_cat, valid_features, valid_cat)
+  if len(projection_cache) > projection_cache_size:
+    projection_cache.popitem(last=False)
+
+  return lda, train_features, train_cat, valid_features, valid_cat
 
 def train(mlp, dataloader, categories):
   """
 
   Function that create a LinearDiscriminantAnalysis (LDA) fited with the extracted features from the train section of the given dataloader.
   Then the given MLP is fited with the transformed features list returns by the LDA created.
+  The LDA and the transformed features are given by project(), so they are shared by the trainings on the same categories.
 
-  Finaly we get the accuracy from the method score of MLP. We do this for both section training and validation
+  Finaly we evaluate the MLP with one prediction of each section training and validation, see Evaluation.
+  The accuracies, which were returned before the Evaluation, are given by getAccuracy().
 
   :param mlp: a classifier multilayer perceptron to use
   :param dataloader: the DataLoader used during the preprocessing dataset loading
@@ -26,24 +186,109 @@ def train(mlp, dataloader, categories):
   :type dataloader: DataLoader
   :type categories: List
 
-  :return: (the train accuracy, the validation accuracy, the used LinearDiscriminantAnalysis object during training)
+  :return: (the train Evaluation, the validation Evaluation, the used LinearDiscriminantAnalysis object during training)
   :rtype: tuple
   """
-  dl = dataloader
+  lda, train_features, train_cat, valid_features, valid_cat = project(dataloader, categories)
 
-  l_features, l_cat = dl.convergeFeatures(categories, 'train')
-  
-  lda = LinearDiscriminantAnalysis(n_components=1).fit(l_features, l_cat)
+  train_evaluation, valid_evaluation = fitAndEvaluate(mlp, train_features, train_cat, valid_features, valid_cat,
+                                                      dataloader.getSubsetRows(categories, 'train'), dataloader.getSubsetRows(categories, 'valid'))
   
-  l_features = lda.transform(l_features)
+  return train_evaluation, valid_evaluation, lda
 
-  mlp.fit(l_features, l_cat)
+@profiler.stage("scoring")
+def evaluateStreaming(mlp, lda, dataloader, categories, section, batch_size=256):
+  """
+  Evaluate the given MLP on the given section by mini-batches, only the predicted categories are kept
+
+  :param mlp: a fitted classifier multilayer perceptron
+  :param lda: the LinearDiscriminantAnalysis used to transform the features given to the mlp
+  :param dataloader: the DataLoader used during the preprocessing dataset loading
+  :param categories: the list of data categories
+  :param section: the section to evaluate, 'train' or 'valid'
+  :param batch_size: number of rows predicted at a time
+  :type mlp: MLPClassifier
+  :type lda: LinearDiscriminantAnalysis
+  :type dataloader: DataLoader
+  :type categories: List
+  :type section: str
+  :type batch_size: int
 
-  train_accuracy = mlp.score(l_features, l_cat)
+  :return: the Evaluation of the mlp on the section
+  :rtype: Evaluation
+  """
+  l_supposed, l_expected, l_rows = [], [], []
 
-  l_features, l_cat = dl.convergeFeatures(categories, 'valid')
-  l_features = lda.transform(l_features)
+  for l_features, l_cat, rows in dataloader.iterBatches(categories, section, batch_size, shuffle=False, rows=True):
+    l_supposed.append(mlp.predict(lda.transform(l_features)))
+    l_expected.append(l_cat)
+    l_rows.append(rows)
 
-  valid_accuracy = mlp.score(l_features, l_cat)
-  
-  return train_accuracy, valid_accuracy, lda
+  expected = np.concatenate(l_expected + [np.zeros(0, dtype=mlp.classes_.dtype)])
+  profiler.count("samples_predicted", len(expected))
+
+  return Evaluation(np.union1d(mlp.classes_, expected), expected, np.concatenate(l_supposed + [np.zeros(0, dtype=mlp.classes_.dtype)]),
+                    np.concatenate(l_rows + [np.zeros(0, dtype=np.int64)]))
+
+def trainStreaming(mlp, dataloader, categories, epochs=10, batch_size=256, lda_sample=10000, seed=1):
+  """
+
+  Streaming version of train where the rows given to the LDA and to the mlp are copied by mini-batches: the
+  memory used by the training depends on batch_size and lda_sample, not on the size of the dataset. The
+  mini-batches are sliced from the feature arrays of the DataLoader, which stay in memory with the whole
+  dataset (and its decoded images, unless the DataLoader is in low memory mode), so the peak memory of the
+  process is not bounded by batch_size.
+
+  The LinearDiscriminantAnalysis is fited with the first lda_sample rows of a shuffled pass on the train section,
+  which are a uniform sample of the section. Then the given MLP is fited with partial_fit on shuffled
+  mini-batches of the transformed features for the given number of epochs.
+
+  Finaly the mlp is evaluated by mini-batches for both section training and validation, like train it
+  returns Evaluations whose accuracies are given by getAccuracy()
+
+  :param mlp: a classifier multilayer perceptron to use, its solver must support partial_fit and early_stopping must be False,
+              its warm_start is set to False since partial_fit does not need it
+  :param dataloader: the DataLoader used during the preprocessing dataset loading
+  :param categories: the list of data categories
+  :param epochs: number of passes on the train section
+  :param batch_size: number of rows of each mini-batch
+  :param lda_sample: max number of rows used to fit the LDA
+  :param seed: seed of the shuffle of the mini-batches
+  :type mlp: MLPClassifier
+  :type dataloader: DataLoader
+  :type categories: List
+  :type epochs: int
+  :type batch_size: int
+  :type lda_sample: int
+  :type seed: int
+
+  :return: (the train Evaluation, the validation Evaluation, the used LinearDiscriminantAnalysis object during training)
+  :rtype: tuple
+  """
+  dl = dataloader
+  classes = np.unique(np.asarray(categories))
+
+  l_features, l_cat, n = [], [], 0
+  for f, cat in dl.iterBatches(categories, 'train', batch_size, seed=seed):
+    l_features.append(f)
+    l_cat.append(cat)
+    n += len(cat)
+    if n >= lda_sample:
+      break
+
+  with profiler.stage("lda_fit"):
+    lda = LinearDiscriminantAnalysis(n_components=1).fit(np.concatenate(l_features)[:lda_sample], np.concatenate(l_cat)[:lda_sample])
+  del l_features, l_cat
+
+  # partial_fit does not need warm_start, which makes it refuse a mini-batch without every class
+  mlp.set_params(warm_start=False)
+
+  with profiler.stage("mlp_fit"):
+    for epoch in range(epochs):
+      for f, cat in dl.iterBatches(categories, 'train', batch_size, seed=seed + epoch):
+        mlp.partial_fit(lda.transform(f), cat, classes=classes)
+
+  train_evaluation = evaluateStreaming(mlp, lda, dl, categories, 'train', batch_size)
+  valid_evaluation = evaluateStreaming(mlp, lda, dl, categories, 'valid', batch_size)
+
+  return train_evaluation, valid_evaluation, lda
@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`TuningJournal` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+TuningJournal Module
+
+"""
+
+import pickle
+import json
+import os
+
+class TuningJournal:
+    """
+    Create a TuningJournal which appends every finished trial of a HyperparameterTuning
+    to a jsonl file, with its configuration, categories, accuracies, fit time and the path
+    of the pickled (mlp, lda) couple, so an interrupted grid search can be resumed.
+    """
+    def __init__(self, path):
+        """
+        :param path: path of the folder of the journal
+        :type path: str
+        :build: a TuningJournal associated to the given folder, the finished trials are read by load()
+
+        :UC: type(path) == str
+        """
+        assert(type(path) == str)
+
+        self.path = path
+        self.d_records = {}
+
+    def getJournalPath(self):
+        """
+        :return: the path of the jsonl file of the journal
+        :rtype: str
+        """
+        return os.path.join(self.path, "journal.jsonl")
+
+    def getRecords(self):
+        """
+        :return: dictionnary which contains the last record of each finished trial by (key, trial index)
+        :rtype: dict
+        """
+        return self.d_records
+
+    def load(self):
+        """
+        :return: None
+        :side effect: read the records of the journal, a line which can not be read (like the last line of
+                      an interrupted run) is ignored
+        """
+        self.d_records = {}
+
+        if not os.path.exists(self.getJournalPath()):
+            return
+
+        with open(self.getJournalPath(), 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self.d_records[(record.get('key'), record['trial'])] = record
+
+    def find(self, trial, nb_cat, hidden_layer, key=None):
+        """
+        :param trial: index of the trial in the grid
+        :param nb_cat: number of categories of the trial
+        :param hidden_layer: size of the hidden layers of the trial
+        :param key: key of the dataset and of the configuration of the trial, see ModelStore.modelKey
+        :type trial: int
+        :type nb_cat: int
+        :type hidden_layer: int
+        :type key: str
+
+        :return: the record of the given trial if it has been finished with the same key and configuration, None otherwise
+        :rtype: dict
+        """
+        record = self.d_records.get((key, trial))
+
+        if record is None or record.get('key') != key or record['nb_cat'] != nb_cat or record['hidden_layer'] != hidden_layer:
+            return None
+        if not os.path.exists(os.path.join(self.path, record['model'])):
+            return None
+
+        return record
+
+    def loadModel(self, record, key=None):
+        """
+        :param record: a record of the journal
+        :param key: key of the dataset and of the configuration of the trial, see ModelStore.modelKey
+        :type record: dict
+        :type key: str
+
+        :return: the (mlp, lda) couple of the given record
+        :rtype: tuple
+        :side effect: raise a ValueError if the record or its pickled model has not been written with the given key
+        """
+        with open(os.path.join(self.path, record['model']), 'rb') as f:
+            model = pickle.load(f)
+
+        if record.get('key') != key or len(model) != 3 or model[0] != key:
+            raise ValueError("the model {} of the journal was not written with the key {}".format(record['model'], key))
+
+        return model[1], model[2]
+
+    def append(self, trial, nb_cat, hidden_layer, categories, mlp, lda, train_accuracy, valid_accuracy, fit_s, key=None):
+        """
+        :param trial: index of the trial in the grid
+        :param nb_cat: number of categories of the trial
+        :param hidden_layer: size of the hidden layers of the trial
+        :param categories: the categories of the trial
+        :param mlp: the fitted mlp
+        :param lda: the LinearDiscriminantAnalysis of the trial
+        :param train_accuracy: the train accuracy
+        :param valid_accuracy: the validation accuracy
+        :param fit_s: time of the training in seconds
+        :param key: key of the dataset and of the configuration of the trial, see ModelStore.modelKey
+        :type trial: int
+        :type nb_cat: int
+        :type hidden_layer: int
+        :type categories: list
+        :type mlp: MLPClassifier
+        :type lda: LinearDiscriminantAnalysis
+        :type train_accuracy: float
+        :type valid_accuracy: float
+        :type fit_s: float
+        :type key: str
+
+        :return: None
+        :side effect: pickle the key with the (mlp, lda) couple then append the record of the trial at the end of the journal,
+                      the name of the pickle contains the key so the runs of other configurations in the same folder keep their models
+        """
+        model = os.path.join("models", "trial_{}_{}.pkl".format(key, trial))
+        os.makedirs(os.path.join(self.path, "models"), exist_ok=True)
+
+        tmp_model = os.path.join(self.path, model + ".tmp")
+        with open(tmp_model, 'wb') as f:
+            pickle.dump((key, mlp, lda), f)
+        os.replace(tmp_model, os.path.join(self.path, model))
+
+        record = {'trial' : trial,
+                  'nb_cat' : nb_cat,
+                  'hidden_layer' : hidden_layer,
+                  'categories' : [str(cat) for cat in categories],
+                  'train_accuracy' : train_accuracy,
+                  'valid_accuracy' : valid_accuracy,
+                  'fit_s' : fit_s,
+                  'key' : key,
+                  'model' : model}
+
+        with open(self.getJournalPath(), 'a') as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.d_records[(key, trial)] = record
@@ -17,37 +17,154 @@ from DataLoader import *
 import TrainingModel
 from HyperparameterTuning import *
 from GenerateTest import *
+from Renderer import Renderer
+from CompiledModel import compileModel
+from ModelStore import modelKey
+from Profiler import profiler
 from math import floor
-
-def main():
+import argparse
+
+def parseArgs():
+  """
+  :return: the options given on the command line
+  :rtype: argparse.Namespace
+  """
+  parser = argparse.ArgumentParser(description="Image classification with a multilayer perceptron")
+  parser.add_argument("--data", default="data/train", help="folder of the images by category, or folder of a packed shard dataset (see ShardDataset)")
+  parser.add_argument("--workers", type=int, default=0, help="number of workers used to decode the images (0 = sequential)")
+  parser.add_argument("--chunksize", type=int, default=16, help="number of images sent to a decoding worker at a time")
+  parser.add_argument("--pool", choices=["process", "thread"], default="process", help="kind of pool used to decode the images")
+  parser.add_argument("--store", default=None, help="folder of the memory-mapped store of the decoded images")
+  parser.add_argument("--pipeline", action="store_true", help="read, decode and extract the features of the images with a streaming pipeline (the store is not used)")
+  parser.add_argument("--pipeline-workers", default="1,1,1", help="number of threads of the reader, decoder and features stages of the pipeline")
+  parser.add_argument("--pipeline-batch", type=int, default=64, help="number of images of an item of the pipeline")
+  parser.add_argument("--pipeline-queue", type=int, default=8, help="max number of items waiting between two stages of the pipeline")
+  parser.add_argument("--low-memory", action="store_true", help="drop the decoded images once their features are extracted and store the features as float32")
+  parser.add_argument("--image-cache", type=int, default=64, help="number of images decoded again in low memory mode which are kept in memory")
+  parser.add_argument("--feature-cache", default=None, help="folder of the on-disk cache of the extracted features")
+  parser.add_argument("--feature-cache-size", type=int, default=256, help="max size in MB of the cached features")
+  parser.add_argument("--streaming", action="store_true", help="train the mlp with partial_fit on mini-batches (the features stay in memory)")
+  parser.add_argument("--epochs", type=int, default=10, help="number of epochs of the streaming training")
+  parser.add_argument("--batch-size", type=int, default=256, help="size of the mini-batches of the streaming training")
+  parser.add_argument("--report", default=None, help="path of the json report of the timing of each stage of the run")
+  parser.add_argument("--trace-memory", action="store_true", help="report the peak memory of each stage with tracemalloc")
+  parser.add_argument("--profile-stage", default=None, help="name of a stage to profile with cProfile")
+  parser.add_argument("--profile-output", default="profile.prof", help="path of the cProfile stats of the profiled stage")
+  parser.add_argument("--tuning-workers", type=int, default=0, help="number of processes which train the mlp of the grid search (0 = sequential, not with --streaming)")
+  parser.add_argument("--halving", action="store_true", help="prune the grid search by successive halving (full-batch fits in the current process only)")
+  parser.add_argument("--halving-min-iter", type=int, default=10, help="number of iterations of the first round of successive halving")
+  parser.add_argument("--halving-eta", type=int, default=2, help="inverse of the portion of mlp kept at each round of successive halving")
+  parser.add_argument("--journal", default=None, help="folder of the journal of the grid search, used to resume an interrupted run")
+  parser.add_argument("--cv", type=int, default=0, help="number of folds of the cross-validation of each configuration of the grid search (0 = no cross-validation)")
+  parser.add_argument("--cv-seed", type=int, default=0, help="seed of the folds of the cross-validation")
+  parser.add_argument("--render-workers", type=int, default=0, help="number of processes which render the test figures (0 = sequential)")
+  parser.add_argument("--montage", action="store_true", help="tile all the test images in data/res/montage.png instead of one figure by image")
+  parser.add_argument("--export", default=None, help="path of the .npz file where the best mlp on all the categories is exported as a CompiledModel")
+  parser.add_argument("--models", default=None, help="folder of the store of the trained models, they are loaded instead of trained when they are up to date")
+  args = parser.parse_args()
+
+  # successive halving trains its rounds with warm started full-batch fits in the current process
+  if args.streaming and args.tuning_workers > 0:
+    parser.error("--streaming can not be used with --tuning-workers, the streaming trials are trained in the current process")
+  if args.halving and args.streaming:
+    parser.error("--halving can not be used with --streaming")
+  if args.halving and args.tuning_workers > 0:
+    parser.error("--halving can not be used with --tuning-workers")
+  if args.halving and args.journal is not None:
+    parser.error("--halving can not be used with --journal, only the trials of the full grid are journaled")
+
+  return args
+
+def main(args):
   cl = CategoriesLoader("data/descriptions/categories.txt")
   cl.foundCategories()
 
-  ml = MatrixLoader("data/train",cl.getCategories())
-  ml.generateTrainAndValidMatrixImg()
+  ml = MatrixLoader(args.data,cl.getCategories())
+  ml.setParallelDecoding(args.workers, args.chunksize, args.pool)
+  ml.setImageStore(args.store)
+
+  if args.pipeline:
+    ml.generateTrainAndValidFiles()
+  else:
+    ml.generateTrainAndValidMatrixImg()
 
   dl = DataLoader(ml.getDataImg(),ml.getDictionnaryEndIndex())
-  dl.load()
+  dl.setFeatureCache(args.feature_cache, args.feature_cache_size * 2**20)
+  if args.low_memory:
+    dl.setLowMemory(ml, args.image_cache)
+
+  if args.pipeline:
+    dl.loadStreaming(ml, tuple(int(w) for w in args.pipeline_workers.split(",")), args.pipeline_batch, args.pipeline_queue)
+  else:
+    dl.load()
+
+  hpt = HyperparameterTuning(dl,cl.getCategories())
+  if args.streaming:
+    hpt.setStreaming(args.epochs, args.batch_size)
+  hpt.setWorkers(args.tuning_workers)
+
+  if args.models is not None or args.journal is not None:
+    fingerprint = ml.getFingerprint()
+    config = {'features' : dl.getFeatureLoader().getConfig(),
+              'tuning' : hpt.getConfig(),
+              'halving' : {'min_iter' : args.halving_min_iter, 'eta' : args.halving_eta} if args.halving else None}
+    if args.low_memory: # the float32 features give slightly different models
+      config['features_dtype'] = 'float32'
+
+  if args.journal is not None:
+    hpt.setJournal(args.journal, modelKey(fingerprint, config))
+
+  if args.models is not None:
+    if hpt.loadModels(args.models, fingerprint, config):
+      return dl, hpt, cl, ml
 
   mlp = MLPClassifier(solver='adam', alpha=1e-5,hidden_layer_sizes=(32, 32), random_state=1,
-      max_iter=10000, warm_start=True)
+      max_iter=10000, warm_start=not args.streaming)
 
-  train_accuracy, valid_accuracy, lda = TrainingModel.train(mlp, dl, cl.getCategories())
-  print("\n\nWITHOUT Hyperparameter Tuning :\n\n\t- train_acc {}\n\t- val acc {}\n\t- rand {}".format(train_accuracy, valid_accuracy, 1/len(cl.getCategories())),end='\n\n')
+  if args.streaming:
+    train_evaluation, valid_evaluation, lda = TrainingModel.trainStreaming(mlp, dl, cl.getCategories(), args.epochs, args.batch_size)
+  else:
+    train_evaluation, valid_evaluation, lda = TrainingModel.train(mlp, dl, cl.getCategories())
+  print("\n\nWITHOUT Hyperparameter Tuning :\n\n\t- train_acc {}\n\t- val acc {}\n\t- rand {}".format(train_evaluation.getAccuracy(), valid_evaluation.getAccuracy(), 1/len(cl.getCategories())),end='\n\n')
+  for cat, report in valid_evaluation.getReport()['categories'].items():
+    print("\t- {} : precision {:.3f} recall {:.3f} ({} images)".format(cat, report['precision'], report['recall'], report['support']))
+  print()
 
-  hpt = HyperparameterTuning(dl,cl.getCategories())
+  if args.halving:
+    hpt.startSuccessiveHalving(args.halving_min_iter, args.halving_eta)
+  else:
+    hpt.startIterate()
 
-  hpt.startIterate()
+  if args.models is not None:
+    hpt.saveModels(args.models, fingerprint, config)
 
-  return dl, hpt, cl
+  return dl, hpt, cl, ml
 
 if __name__ == "__main__":
-  dl, hpt, cl = main()
+  args = parseArgs()
+
+  if args.trace_memory:
+    profiler.enableMemoryTracing()
+  profiler.setProfiledStage(args.profile_stage)
+
+  dl, hpt, cl, ml = main(args)
+
+  if args.cv > 1:
+    hpt.startCrossValidation(args.cv, args.cv_seed)
 
   test = GenerateTest(dl,hpt,cl)
+  test.setRenderer(Renderer(args.render_workers), args.montage)
 
   hpt_hl_step = (hpt.max_layer // hpt.min_layer)
 
   nb_cat_slice = hpt_hl_step * floor(max(hpt.valid_accuracy)/hpt_hl_step)
 
   test.startTest(hpt_hl_step * nb_cat_slice)
+  ml.close() # the images are not read any more
+
+  if args.export is not None:
+    compileModel(*hpt.getBestMLP(len(cl.getCategories()))).save(args.export)
+    print("CompiledModel exported -> " + args.export,end='\n\n')
+
+  if args.report is not None:
+    profiler.writeReport(args.report, args.profile_output if args.profile_stage else None)
@@ -0,0 +1,274 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`predict` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+Predict Module
+
+Classify the images of directories or files with a model exported by main.py --export:
+
+$ python3 src/predict.py --model model.npz data/test/ > predictions.csv
+
+Only batch_size images, and the batch decoded ahead, are in memory at a time, the predictions
+of a batch are written as soon as it is classified.
+
+"""
+
+from MatrixLoader import POOLS
+from FeatureLoader import FeatureLoader
+from CompiledModel import loadModel, compileModel
+from imageio import imread
+import numpy as np
+import argparse
+import pickle
+import json
+import time
+import csv
+import sys
+import os
+
+EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff')
+
+def parseArgs():
+  """
+  :return: the options given on the command line
+  :rtype: argparse.Namespace
+  """
+  parser = argparse.ArgumentParser(description="Classify images with a saved model")
+  parser.add_argument("inputs", nargs="*", help="image files or directories of images")
+  parser.add_argument("--list", default=None, help="file which contains one image path by line, - for the standard input")
+  parser.add_argument("--model", required=True, help="CompiledModel .npz file (main.py --export) or pickled (mlp, lda) couple")
+  parser.add_argument("--output", default=None, help="output file, the standard output by default")
+  parser.add_argument("--format", choices=["csv", "jsonl"], default="csv", help="format of the predictions")
+  parser.add_argument("--proba", action="store_true", help="also write the probability of each category")
+  parser.add_argument("--batch-size", type=int, default=512, help="number of images classified at a time")
+  parser.add_argument("--workers", type=int, default=0, help="number of workers used to decode the images (0 = sequential)")
+  parser.add_argument("--chunksize", type=int, default=16, help="number of images sent to a decoding worker at a time")
+  parser.add_argument("--pool", choices=["process", "thread"], default="process", help="kind of pool used to decode the images")
+  return parser.parse_args()
+
+def listImages(inputs, list_file=None):
+  """
+  Generator of the image paths of the given inputs, the directories are walked in sorted order
+
+  :param inputs: image files or directories of images
+  :param list_file: file which contains one image path by line, - for the standard input, None for no file
+  :type inputs: list
+  :type list_file: str
+
+  :return: generator of image paths
+  :rtype: generator
+  """
+  for path in inputs:
+    if os.path.isdir(path):
+      for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+          if name.lower().endswith(EXTENSIONS):
+            yield os.path.join(root, name)
+    else:
+      yield path
+
+  if list_file is not None:
+    f = sys.stdin if list_file == "-" else open(list_file, 'r')
+    try:
+      for line in f:
+        if line.strip() != "":
+          yield line.strip()
+    finally:
+      if f is not sys.stdin:
+        f.close()
+
+def readImage(path):
+  """
+  :param path: path of an image
+  :type path: str
+
+  :return: (the greyscale matrix of the image, None) or (None, the error message) if it can not be read
+  :rtype: tuple
+  """
+  try:
+    img = np.asarray(imread(path))
+  except Exception as e:
+    return None, str(e)
+
+  if img.ndim == 3: # colour images are converted like the greyscale images of the dataset
+    img = img[..., :3] @ np.array([0.299, 0.587, 0.114])
+
+  return img, None
+
+def loadPredictor(path):
+  """
+  :param path: path of a CompiledModel .npz file or of a pickled (mlp, lda) couple
+  :type path: str
+
+  :return: the CompiledModel of the given file
+  :rtype: CompiledModel
+  """
+  if path.endswith('.npz'):
+    return loadModel(path)
+
+  with open(path, 'rb') as f:
+    return compileModel(*pickle.load(f))
+
+def iterChunks(paths, size):
+  """
+  :param paths: iterable of image paths
+  :param size: number of paths of a chunk
+  :type paths: iterable
+  :type size: int
+
+  :return: generator of the lists of size paths of the given iterable, the last one can be smaller
+  :rtype: generator
+  """
+  chunk = []
+  for path in paths:
+    chunk.append(path)
+    if len(chunk) == size:
+      yield chunk
+      chunk = []
+  if len(chunk) > 0:
+    yield chunk
+
+def iterDecodedBatches(paths, batch_size, executor=None, chunksize=16):
+  """
+  Generator of the decoded batches of the given paths. With an executor the next batch is decoded
+  while the current one is classified, so at most two batches are in memory.
+
+  :param paths: iterable of image paths
+  :param batch_size: number of images of a batch
+  :param executor: pool which decodes the images, None to decode them in the current process
+  :param chunksize: number of images sent to a worker at a time
+  :type paths: iterable
+  :type batch_size: int
+  :type executor: Executor
+  :type chunksize: int
+
+  :return: generator of couples (paths of the batch, list of results of readImage)
+  :rtype: generator
+  """
+  if executor is None:
+    for chunk in iterChunks(paths, batch_size):
+      yield chunk, [readImage(path) for path in chunk]
+    return
+
+  pending = None
+  for chunk in iterChunks(paths, batch_size):
+    submitted = (chunk, executor.map(readImage, chunk, chunksize=chunksize)) # the images are submitted now, read later
+    if pending is not None:
+      yield pending[0], list(pending[1])
+    pending = submitted
+  if pending is not None:
+    yield pending[0], list(pending[1])
+
+def classifyBatch(model, fl, l_img):
+  """
+  :param model: the CompiledModel
+  :param fl: the FeatureLoader which gives the features of the model
+  :param l_img: list of greyscale matrix images, None for the images which can not be read
+  :type model: CompiledModel
+  :type fl: FeatureLoader
+  :type l_img: list
+
+  :return: (the probabilities of each category for each image, a line of nan for the images which are None or
+           can not be classified, and the error message of each image which can not be classified, None for the other ones)
+  :rtype: tuple
+  """
+  proba = np.full((len(l_img), len(model.getClasses())), np.nan)
+  features, errors = fl.getFeaturesFromImages(l_img)
+
+  valid = np.array([img is not None and error is None for img, error in zip(l_img, errors)], dtype=bool)
+  if valid.any():
+    proba[valid] = model.predictProba(features[valid])
+
+  return proba, errors
+
+class PredictionWriter:
+  """
+  Create a PredictionWriter which writes the predictions of the images in csv or jsonl
+  """
+  def __init__(self, f, out_format, classes, proba=False):
+    """
+    :param f: the opened output file
+    :param out_format: 'csv' or 'jsonl'
+    :param classes: the categories of the model
+    :param proba: if True the probability of each category is written
+    :type f: file
+    :type out_format: str
+    :type classes: ndarray
+    :type proba: bool
+    :build: a PredictionWriter which writes in the given file
+
+    :UC: out_format in ['csv','jsonl']
+    """
+    assert(out_format in ['csv', 'jsonl'])
+
+    self.f = f
+    self.format = out_format
+    self.classes = [str(cat) for cat in classes]
+    self.proba = proba
+
+    if self.format == 'csv':
+      self.writer = csv.writer(f)
+      self.writer.writerow(['path', 'category', 'error'] + (['proba_' + cat for cat in self.classes] if proba else []))
+
+  def write(self, paths, proba, errors):
+    """
+    :param paths: the paths of the images of the batch
+    :param proba: the probabilities of each category for each image of the batch
+    :param errors: the error message of each image, None for the read images
+    :type paths: list
+    :type proba: ndarray
+    :type errors: list
+
+    :return: none
+    :side effect: write and flush one line by image of the batch
+    """
+    for path, p, error in zip(paths, proba, errors):
+      category = None if error is not None else self.classes[int(np.argmax(p))]
+
+      if self.format == 'csv':
+        self.writer.writerow([path, category or '', error or ''] + (['' if error is not None else '{:.6f}'.format(v) for v in p] if self.proba else []))
+      else:
+        record = {'path' : path, 'category' : category}
+        if error is not None:
+          record['error'] = error
+        elif self.proba:
+          record['proba'] = {cat : float(v) for cat, v in zip(self.classes, p)}
+        self.f.write(json.dumps(record) + "\n")
+
+    self.f.flush()
+
+def main(args):
+  model = loadPredictor(args.model)
+  fl = FeatureLoader(model.scalings.shape[0])
+
+  out = sys.stdout if args.output is None else open(args.output, 'w', newline='')
+  writer = PredictionWriter(out, args.format, model.getClasses(), args.proba)
+  executor = POOLS[args.pool](max_workers=args.workers) if args.workers > 0 else None
+
+  n, n_errors, start = 0, 0, time.perf_counter()
+  try:
+    for paths, l_res in iterDecodedBatches(listImages(args.inputs, args.list), args.batch_size, executor, args.chunksize):
+      l_img = [img for img, error in l_res]
+      proba, l_errors = classifyBatch(model, fl, l_img)
+      errors = [error or classify_error for (img, error), classify_error in zip(l_res, l_errors)]
+
+      writer.write(paths, proba, errors)
+
+      n += len(paths)
+      n_errors += sum(error is not None for error in errors)
+  finally:
+    if executor is not None:
+      executor.shutdown()
+    if out is not sys.stdout:
+      out.close()
+
+  elapsed = time.perf_counter() - start
+  print("PREDICTED {} IMAGES ({} ERRORS) IN {:.2f}s -> {:.1f} img/s".format(n, n_errors, elapsed, n / max(elapsed, 1e-9)), file=sys.stderr)
+
+if __name__ == "__main__":
+  main(parseArgs())
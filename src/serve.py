@@ -0,0 +1,331 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`serve` module
+:author: Pather Stevenson - Faculté des Sciences et Technologies - Univ. Lille <http://portail.fil.univ-lille1.fr>_
+:date: october 2026
+
+Serve Module
+
+Local HTTP service which keeps a model exported by main.py --export and the FeatureLoader loaded:
+
+$ python3 src/serve.py --model model.npz --port 8080
+
+* POST /predict with the bytes of an image, or a json {"features" : [...]}, returns the json {"category" : ..., "proba" : {...}}
+* GET /metrics returns the json counters of the service (requests, batches, latency percentiles, throughput)
+* GET /health returns ok
+
+The concurrent requests are grouped in micro-batches of at most --max-batch requests, a batch
+waits at most --max-wait-ms after its first request. The service only listens on the loopback interface.
+
+"""
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from FeatureLoader import FeatureLoader
+from predict import loadPredictor, readImage
+from collections import deque
+from io import BytesIO
+import numpy as np
+import threading
+import argparse
+import queue
+import json
+import time
+
+def parseArgs():
+  """
+  :return: the options given on the command line
+  :rtype: argparse.Namespace
+  """
+  parser = argparse.ArgumentParser(description="Local prediction service with micro-batching")
+  parser.add_argument("--model", required=True, help="CompiledModel .npz file (main.py --export) or pickled (mlp, lda) couple")
+  parser.add_argument("--port", type=int, default=8080, help="port of the service on 127.0.0.1")
+  parser.add_argument("--max-batch", type=int, default=64, help="max number of requests of a micro-batch")
+  parser.add_argument("--max-wait-ms", type=float, default=5, help="max time a micro-batch waits for more requests after its first one")
+  return parser.parse_args()
+
+class Request:
+  """
+  Create a Request which holds an image or features given to a MicroBatcher until its result is set
+  """
+  def __init__(self, img=None, features=None):
+    """
+    :param img: the greyscale matrix image to classify, None if features are given
+    :param features: the features to classify, None if an image is given
+    :type img: ndarray
+    :type features: ndarray
+    :build: a Request without result
+
+    :UC: exactly one of img and features is given
+    """
+    assert((img is None) != (features is None))
+
+    self.img = img
+    self.features = features
+    self.start = time.perf_counter()
+    self.done = threading.Event()
+    self.proba = None
+    self.error = None
+
+  def wait(self):
+    """
+    :return: (the probabilities of each category, None) or (None, the error message)
+    :rtype: tuple
+    """
+    self.done.wait()
+    return self.proba, self.error
+
+class MicroBatcher:
+  """
+  Create a MicroBatcher which classifies the requests of many threads with one thread: the waiting
+  requests are grouped in batches of at most max_batch requests, and a batch is started at most
+  max_wait seconds after its first request. The features of the images are computed by one batched call.
+  """
+  def __init__(self, model, max_batch=64, max_wait=0.005, history=10000):
+    """
+    :param model: the CompiledModel
+    :param max_batch: max number of requests of a batch
+    :param max_wait: max time in seconds a batch waits for more requests after its first one
+    :param history: number of last request latencies kept for the percentiles
+    :type model: CompiledModel
+    :type max_batch: int
+    :type max_wait: float
+    :type history: int
+    :build: a MicroBatcher whose thread is started by start()
+
+    :UC: max_batch > 0 & max_wait >= 0
+    """
+    assert(max_batch > 0 and max_wait >= 0)
+
+    self.model = model
+    self.fl = FeatureLoader(model.scalings.shape[0])
+    self.max_batch = max_batch
+    self.max_wait = max_wait
+    self.queue = queue.Queue()
+    self.thread = threading.Thread(target=self.run, daemon=True)
+    self.lock = threading.Lock()
+    self.latencies = deque(maxlen=history)
+    self.d_counters = {'requests' : 0, 'errors' : 0, 'batches' : 0, 'batched_requests' : 0, 'busy_s' : 0.0}
+    self.started = time.perf_counter()
+
+  def start(self):
+    """
+    :return: none
+    :side effect: start the thread which classifies the requests
+    """
+    self.thread.start()
+
+  def submit(self, request):
+    """
+    :param request: the request to classify
+    :type request: Request
+
+    :return: (the probabilities of each category, None) or (None, the error message), once the batch of the request is classified
+    :rtype: tuple
+    """
+    self.queue.put(request)
+    return request.wait()
+
+  def nextBatch(self):
+    """
+    :return: the list of the next requests to classify, it waits for the first one
+    :rtype: list
+    """
+    batch = [self.queue.get()]
+    deadline = time.perf_counter() + self.max_wait
+
+    while len(batch) < self.max_batch:
+      timeout = deadline - time.perf_counter()
+      try:
+        batch.append(self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait())
+      except queue.Empty:
+        break
+
+    return batch
+
+  def classify(self, batch):
+    """
+    :param batch: list of requests
+    :type batch: list
+
+    :return: none
+    :side effect: set the probabilities, or the error, of each request of the batch
+    """
+    # the features of the images are computed by one batched call by image shape
+    features, errors = self.fl.getFeaturesFromImages([request.img for request in batch])
+    valid = np.ones(len(batch), dtype=bool)
+
+    for i, request in enumerate(batch):
+      if request.features is not None:
+        if request.features.shape != (features.shape[1],):
+          request.error = "expected {} features, got shape {}".format(features.shape[1], request.features.shape)
+          valid[i] = False
+        else:
+          features[i] = request.features
+      elif errors[i] is not None:
+        request.error = errors[i]
+        valid[i] = False
+
+    if valid.any():
+      proba = self.model.predictProba(features[valid])
+      for request, p in zip([request for request, ok in zip(batch, valid) if ok], proba):
+        request.proba = p
+
+  def run(self):
+    """
+    :return: none
+    :side effect: classify the requests of the queue batch by batch, forever
+    """
+    while True:
+      batch = self.nextBatch()
+      start = time.perf_counter()
+
+      try:
+        self.classify(batch)
+      except Exception as e:
+        for request in batch:
+          request.error = request.error or str(e)
+
+      end = time.perf_counter()
+      with self.lock:
+        self.d_counters['batches'] += 1
+        self.d_counters['batched_requests'] += len(batch)
+        self.d_counters['busy_s'] += end - start
+        for request in batch:
+          self.d_counters['requests'] += 1
+          self.d_counters['errors'] += request.error is not None
+          self.latencies.append(end - request.start)
+
+      for request in batch:
+        request.done.set()
+
+  def getMetrics(self):
+    """
+    :return: dictionnary which contains the counters, the mean batch size, the throughput and the
+             latency percentiles in ms of the last requests
+    :rtype: dict
+    """
+    with self.lock:
+      metrics = dict(self.d_counters)
+      latencies = np.array(self.latencies) * 1000
+
+    uptime = time.perf_counter() - self.started
+    metrics['uptime_s'] = uptime
+    metrics['queue_depth'] = self.queue.qsize()
+    metrics['mean_batch_size'] = metrics['batched_requests'] / max(metrics['batches'], 1)
+    metrics['throughput_rps'] = metrics['requests'] / max(uptime, 1e-9)
+    metrics['latency_ms'] = {name : float(np.percentile(latencies, q)) if len(latencies) > 0 else None
+                             for name, q in [('p50', 50), ('p95', 95), ('p99', 99), ('max', 100)]}
+    metrics['max_batch'] = self.max_batch
+    metrics['max_wait_ms'] = self.max_wait * 1000
+
+    return metrics
+
+class PredictionHandler(BaseHTTPRequestHandler):
+  """
+  Handler of the HTTP requests of the service, the MicroBatcher is given by the server
+  """
+  def sendJson(self, code, obj):
+    """
+    :param code: the HTTP status code
+    :param obj: the object sent as json
+    :type code: int
+    :type obj: dict
+
+    :return: none
+    """
+    body = json.dumps(obj).encode()
+    self.send_response(code)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def do_GET(self):
+    if self.path == "/metrics":
+      self.sendJson(200, self.server.batcher.getMetrics())
+    elif self.path == "/health":
+      self.sendJson(200, {'status' : 'ok'})
+    else:
+      self.sendJson(404, {'error' : 'unknown path ' + self.path})
+
+  def do_POST(self):
+    if self.path != "/predict":
+      self.sendJson(404, {'error' : 'unknown path ' + self.path})
+      return
+
+    body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    if self.headers.get("Content-Type", "").startswith("application/json"):
+      try:
+        request = Request(features=np.asarray(json.loads(body)['features'], dtype=np.float64))
+      except (ValueError, KeyError, TypeError) as e:
+        self.sendJson(400, {'error' : 'bad json : ' + str(e)})
+        return
+    else:
+      img, error = readImage(BytesIO(body))
+      if error is not None:
+        self.sendJson(400, {'error' : error})
+        return
+      request = Request(img=img)
+
+    proba, error = self.server.batcher.submit(request)
+
+    if error is not None:
+      self.sendJson(400, {'error' : error})
+    else:
+      classes = self.server.batcher.model.getClasses()
+      self.sendJson(200, {'category' : str(classes[int(np.argmax(proba))]),
+                          'proba' : {str(cat) : float(p) for cat, p in zip(classes, proba)}})
+
+  def log_message(self, format, *args):
+    pass # one line by request would slow the service down
+
+class PredictionServer(ThreadingHTTPServer):
+  """
+  ThreadingHTTPServer of the service, whose listen backlog is big enough for many concurrent clients
+  (the default backlog of 5 connections resets the connections of a burst of requests)
+  """
+  request_queue_size = 128
+  daemon_threads = True
+
+def createServer(model, port=8080, max_batch=64, max_wait=0.005):
+  """
+  :param model: the CompiledModel
+  :param port: port of the service, 0 for any free port
+  :param max_batch: max number of requests of a micro-batch
+  :param max_wait: max time in seconds a micro-batch waits for more requests after its first one
+  :type model: CompiledModel
+  :type port: int
+  :type max_batch: int
+  :type max_wait: float
+
+  :return: the HTTP server of the service on 127.0.0.1, its MicroBatcher is started
+  :rtype: PredictionServer
+  """
+  server = PredictionServer(("127.0.0.1", port), PredictionHandler, bind_and_activate=False)
+  server.request_queue_size = max(server.request_queue_size, max_batch) # the listen backlog holds a full micro-batch of new connections
+  try:
+    server.server_bind()
+    server.server_activate()
+  except:
+    server.server_close()
+    raise
+  server.batcher = MicroBatcher(model, max_batch, max_wait)
+  server.batcher.start()
+
+  return server
+
+if __name__ == "__main__":
+  args = parseArgs()
+
+  server = createServer(loadPredictor(args.model), args.port, args.max_batch, args.max_wait_ms / 1000)
+  print("SERVING ON http://127.0.0.1:{} (max batch {}, max wait {}ms)".format(server.server_address[1], args.max_batch, args.max_wait_ms),end='\n\n')
+
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()